@@ -1,11 +1,35 @@
-from flask import Flask, render_template, jsonify
+try:
+    # Collector threads emit to Socket.IO clients; under eventlet they have
+    # to be green threads, or an emit sits unsent until the client's next
+    # ping (up to 25 s). Without eventlet Flask-SocketIO uses real threads.
+    import eventlet
+    eventlet.monkey_patch()
+except ImportError:
+    pass
+
+from flask import Flask, render_template, jsonify, request, Response
 from flask_socketio import SocketIO
-from zeep import Client, Settings
+import argparse
 import json
+import math
+import os
 import threading
+import numpy as np
 import time
 import pytz
-from datetime import datetime
+
+from detector_parser import LIVE_FIELDS, parse_detector_reply, request_detector_reply
+from forecast_engine import Forecaster, select_forecast
+from history_store import HistoryStore
+from poll_scheduler import PollScheduler
+from replay import ReplaySource
+from rollup_store import RollupReader, parse_time
+from live_push import LivePush
+from sensor_metadata import SensorMetadata
+from snapshot_bus import SnapshotPublisher, SnapshotReader
+from soap_settings import soap_parameters
+from station_aggregates import StationAggregator
+from wsdl_cache import CachedClient
 
 # ----------------------------
 # 📍 Load Configuration
@@ -14,6 +38,15 @@ with open("config.json") as f:
     CONFIG = json.load(f)
 
 TIME_STEP_MINUTES = CONFIG.get("time_step_minutes", 0.5)  # fallback to 0.5 if missing
+SOAP_PARSER = CONFIG.get("soap_parser", "zeep")  # "zeep" or "stream"
+FETCH_TIMEOUT_SECONDS = CONFIG.get("fetch_timeout_seconds", 20)
+SNAPSHOT_PATH = CONFIG.get("snapshot_path")  # None -> /dev/shm/traffic_snapshot.bin
+SNAPSHOT_POLL_SECONDS = CONFIG.get("snapshot_poll_seconds", 0.5)
+WSDL_URL = CONFIG.get("wsdl_url", "https://colondexsrv.its.nv.gov/tmddws/TmddWS.svc?singleWsdl")
+WSDL_CACHE_DIR = CONFIG.get("wsdl_cache_dir", "cache/wsdl")
+WSDL_REFRESH_HOURS = CONFIG.get("wsdl_refresh_hours", 24)
+# Written by json_dump_python_v2.py; defaults to where it keeps them
+ROLLUP_DIR = CONFIG.get("rollup_dir") or os.path.join(os.path.expanduser("~"), "Desktop", "json_data", "rollups")
 
 # ----------------------------
 # 📍 Flask App
@@ -22,7 +55,6 @@ app = Flask(__name__)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
 local_timezone = pytz.timezone("America/Los_Angeles")
-wsdl_url = "https://colondexsrv.its.nv.gov/tmddws/TmddWS.svc?singleWsdl"
 metadata_path = "data/sensor_metadata.json"
 
 latest_live_data = {
@@ -30,79 +62,110 @@ latest_live_data = {
     "data": []
 }
 
-# SOAP Settings
-auth_params = {
-    "user-id": "UNLV_TRC_RTIS",
-    "password": "+r@^~Tr&lt;R?|$"
-}
-organization_info = {
-    "organization-id": "unlv.edu",
-    "center-contact-list": {
-        "center-contact-details": {"center-id": "UNLV_TRC"}
-    }
-}
-requesting_organization_info = {
-    "organization-id": "its.nv.gov",
-    "center-contact-list": {
-        "center-contact-details": {"center-id": "FAST"}
-    }
-}
-device_type = "detector"
-device_info = "device data"
-
-soap_parameters = {
-    "device-information-request-header": {
-        "authentication": auth_params,
-        "organization-information": organization_info,
-        "organization-requesting": requesting_organization_info,
-        "device-type": device_type,
-        "device-information-type": device_info
-    }
-}
+# Loaded once: pre-serialized responses plus a lat/lon grid index
+sensor_metadata = SensorMetadata(metadata_path)
+
+# Fixed-size per-detector history covering `sensor_info_minutes_back`
+history_store = HistoryStore.from_config(CONFIG)
+
+# Per-station rollups with rolling windows over `sensor_info_minutes_back`
+station_aggregator = StationAggregator.from_config(CONFIG)
+
+# One batched model call per poll over every detector's history window
+forecaster = Forecaster.from_config(CONFIG, history_store)
+
+# 1-minute / 15-minute / hourly rollups kept by the collector, for long ranges
+rollup_reader = RollupReader(ROLLUP_DIR)
+
+# Full snapshots for legacy clients, per-room deltas for subscribed ones
+live_push = LivePush(socketio, sensor_metadata)
+live_push.register_handlers()
 
 # ----------------------------
-# 📍 Fetch Live Data
+# 📍 Process Snapshots
 # ----------------------------
-def fetch_live_data():
+def process_snapshot(timestamp, columns, tick=None):
+    """Update history and rollups from one poll and push it to clients.
+
+    `tick` is the epoch of the scheduler tick the poll was fetched on; it
+    rides along in the pushed frames so clients can measure latency.
+    """
     global latest_live_data
 
-    settings = Settings(strict=False, xml_huge_tree=True)
+    data = columns.records(LIVE_FIELDS)
+    latest_live_data = {
+        "timestamp": timestamp,
+        "data": data
+    }
+    history_store.append(timestamp, data)
+    print(f"Fetched {len(data)} detectors at {timestamp}")
+    live_push.publish_stations(station_aggregator.update(timestamp, columns))
+    live_push.publish(timestamp, data, tick)
     try:
-        client = Client(wsdl=wsdl_url, settings=settings)
+        live_push.publish_forecast(forecaster.update(timestamp))
     except Exception as e:
-        print(f"Failed to connect to SOAP service: {e}")
-        return
+        print(f"Forecast failed: {e}")
+
+# ----------------------------
+# 📍 Fetch Live Data
+# ----------------------------
+def fetch_live_data(on_snapshot=process_snapshot, replay=None):
+    """Poll TMDD on aligned ticks, or play a ReplaySource back at its own pace."""
+    if replay is None:
+        # Built from the on-disk WSDL copy on the first fetch; only the very
+        # first start has to download it, and a failure there is retried like
+        # any other failed poll
+        soap_client = CachedClient(WSDL_URL, WSDL_CACHE_DIR, timeout=FETCH_TIMEOUT_SECONDS,
+                                   refresh_hours=WSDL_REFRESH_HOURS)
+        soap_client.start_background_refresh()
+        parser = SOAP_PARSER
+        interval = TIME_STEP_MINUTES * 60
 
+        def fetch():
+            return None, request_detector_reply(soap_client.get(), soap_parameters, parser=parser)
+    else:
+        # Replayed polls are rendered TMDD XML and keep their archived timestamps
+        parser = "stream"
+        interval = replay.interval_seconds
+
+        def fetch():
+            result = replay.next_reply()
+            if result is None:
+                print(f"Replay finished after {replay.replayed} polls")
+                scheduler.stop()
+            return result
+
+    def handle_reply(fetched_at, result, fetch_seconds):
+        # Runs on the scheduler's worker while it waits for the next tick
+        if result is None:
+            return
+        timestamp, reply = result
+        columns = parse_detector_reply(reply, LIVE_FIELDS, parser=parser)
+        if columns.size:
+            on_snapshot(timestamp or fetched_at.strftime('%Y-%m-%d %H:%M:%S'), columns, scheduler.tick_of(fetched_at))
+
+    scheduler = PollScheduler(
+        interval,
+        fetch=fetch,
+        handle=handle_reply,
+        on_error=lambda e, attempt: print(f"SOAP request failed (attempt {attempt}): {e}"),
+        name="live" if replay is None else "replay"
+    )
+    scheduler.run()
+
+def watch_snapshots(path=SNAPSHOT_PATH):
+    """Web-worker mode: take polls from a standalone collector's shared memory."""
+    reader = SnapshotReader(path)
+    print(f"Watching snapshots in {reader.path}")
     while True:
         try:
-            response = client.service.dlDetectorDataRequest(**soap_parameters)
-            if response:
-                data = []
-                for item in response:
-                    detector_list = getattr(item, 'detector-list', None)
-                    if not detector_list:
-                        continue
-
-                    detector_details = getattr(detector_list, 'detector-data-detail', [])
-                    for detector in detector_details:
-                        data.append({
-                            "stationId": getattr(detector, "station-id", None),
-                            "detectorId": getattr(detector, "detector-id", None),
-                            "vehicleOccupancy": getattr(detector, "vehicle-occupancy", None),
-                            "vehicleSpeed": getattr(detector, "vehicle-speed", None),
-                            "vehicleCount": getattr(detector, "vehicle-count", None)
-                        })
-
-                latest_live_data = {
-                    "timestamp": datetime.now(local_timezone).strftime('%Y-%m-%d %H:%M:%S'),
-                    "data": data
-                }
-                print(f"Fetched {len(data)} detectors at {latest_live_data['timestamp']}")
-                socketio.emit('new_data', latest_live_data)
+            snapshot = reader.poll()
+            if snapshot:
+                seq, timestamp, columns = snapshot
+                process_snapshot(timestamp, columns)
         except Exception as e:
-            print(f"SOAP request failed: {e}")
-
-        time.sleep(TIME_STEP_MINUTES * 60)
+            print(f"Snapshot processing failed: {e}")
+        time.sleep(SNAPSHOT_POLL_SECONDS)
 
 # ----------------------------
 # 📍 Flask Routes
@@ -111,11 +174,112 @@ def fetch_live_data():
 def map_page():
     return render_template("map.html")
 
+def serialized_response(serialized):
+    """Serve a SerializedBody, gzipped when accepted, with ETag revalidation."""
+    use_gzip = "gzip" in request.headers.get("Accept-Encoding", "")
+    response = Response(serialized.gzip_body if use_gzip else serialized.body, mimetype="application/json")
+    if use_gzip:
+        response.headers["Content-Encoding"] = "gzip"
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = "no-cache"
+    response.set_etag(serialized.etag + ("-gz" if use_gzip else ""))
+    return response.make_conditional(request)
+
+def requested_sets():
+    sets = request.args.get("set")
+    return set(sets.split(",")) if sets else None
+
 @app.route("/metadata")
 def metadata():
-    with open(metadata_path) as f:
-        sensor_metadata = json.load(f)
-    return jsonify(sensor_metadata)
+    bbox = request.args.get("bbox")
+    sets = requested_sets()
+    if not bbox and not sets:
+        return serialized_response(sensor_metadata.full)
+
+    if bbox:
+        try:
+            west, south, east, north = map(float, bbox.split(","))
+            if not all(map(math.isfinite, (west, south, east, north))):
+                raise ValueError(bbox)
+        except ValueError:
+            return jsonify({"error": "bbox must be west,south,east,north"}), 400
+        indices = sensor_metadata.in_bbox(west, south, east, north)
+    else:
+        indices = np.arange(len(sensor_metadata.sensors))
+    if sets:
+        indices = sensor_metadata.filter_sets(indices, sets)
+    return serialized_response(sensor_metadata.subset(tuple(indices.tolist())))
+
+@app.route("/metadata/nearest")
+def metadata_nearest():
+    lat = request.args.get("lat", type=float)
+    lon = request.args.get("lon", type=float)
+    k = min(max(request.args.get("k", default=5, type=int), 1), len(sensor_metadata.sensors))
+    if lat is None or lon is None or not (math.isfinite(lat) and math.isfinite(lon)):
+        return jsonify({"error": "Pass 'lat' and 'lon'."}), 400
+
+    indices, distances = sensor_metadata.nearest(lat, lon, k, requested_sets())
+    return jsonify([
+        dict(sensor_metadata.sensors[i], distance_m=round(d, 1))
+        for i, d in zip(indices.tolist(), distances.tolist())
+    ])
+
+@app.route("/history")
+def history():
+    minutes = request.args.get("minutes", type=float)
+    detector_id = request.args.get("detector")
+    station_id = request.args.get("station")
+
+    if detector_id:
+        samples = history_store.detector_history(detector_id, minutes)
+    elif station_id:
+        samples = history_store.station_history(station_id, minutes)
+    else:
+        return jsonify({"error": "Pass either 'detector' or 'station'."}), 400
+
+    if samples is None:
+        return jsonify({"error": "No history for the requested id."}), 404
+    return jsonify(samples)
+
+@app.route("/range")
+def range_query():
+    detector_id = request.args.get("detector")
+    station_id = request.args.get("station")
+    if not detector_id and not station_id:
+        return jsonify({"error": "Pass either 'detector' or 'station'."}), 400
+
+    try:
+        end = parse_time(request.args["to"]) if "to" in request.args else int(time.time())
+        start = parse_time(request.args["from"]) if "from" in request.args else end - 86400
+        series = rollup_reader.range(
+            "detector" if detector_id else "station",
+            detector_id or station_id,
+            start, end,
+            resolution=request.args.get("resolution", "auto"),
+            points=request.args.get("points", default=200, type=int)
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if series is None:
+        return jsonify({"error": "No rollups for the requested id."}), 404
+    return jsonify(series)
+
+@app.route("/forecast")
+def forecast():
+    latest = forecaster.latest
+    if latest is None:
+        return jsonify({"error": "No forecast yet."}), 404
+
+    detector_id = request.args.get("detector")
+    station_id = request.args.get("station")
+    if detector_id or station_id:
+        latest = select_forecast(
+            latest,
+            station_ids={station_id} if station_id else None,
+            detector_ids={detector_id} if detector_id else None
+        )
+    return jsonify(latest)
 
 @app.route("/config")
 def config():
@@ -125,8 +289,38 @@ def config():
 # 📍 Main
 # ----------------------------
 if __name__ == "__main__":
-    fetch_thread = threading.Thread(target=fetch_live_data)
-    fetch_thread.daemon = True
-    fetch_thread.start()
+    parser = argparse.ArgumentParser(description="Traffic dashboard server.")
+    parser.add_argument(
+        "--mode", choices=["standalone", "collector", "web", "replay"], default="standalone",
+        help="standalone: poll and serve in one process; collector: poll and publish "
+             "to shared memory only; web: serve snapshots published by a collector; "
+             "replay: serve archived polls played back from --replay"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--replay", help="json_data directory or segment archive to replay")
+    parser.add_argument("--speed", type=float, default=60.0, help="replay speed-up over the archived poll spacing")
+    parser.add_argument("--loop", action="store_true", help="restart the replay when it reaches the end")
+    parser.add_argument("--debug", action=argparse.BooleanOptionalAction, default=None,
+                        help="Flask debug mode and reloader (default: on in standalone mode)")
+    args = parser.parse_args()
+    debug = args.mode == "standalone" if args.debug is None else args.debug
+
+    if args.mode == "collector":
+        publisher = SnapshotPublisher(SNAPSHOT_PATH)
+        print(f"Publishing snapshots to {publisher.path}")
+        fetch_live_data(on_snapshot=lambda timestamp, columns, tick: publisher.publish(timestamp, columns))
+    else:
+        if args.mode == "replay":
+            if not args.replay:
+                parser.error("--mode replay needs --replay DIRECTORY")
+            source = ReplaySource(args.replay, speed=args.speed, loop=args.loop)
+            print(f"Replaying {args.replay} at x{args.speed:g} (one poll every {source.interval_seconds:.2f} s)")
+            target = lambda: fetch_live_data(replay=source)
+        else:
+            target = watch_snapshots if args.mode == "web" else fetch_live_data
+        fetch_thread = threading.Thread(target=target)
+        fetch_thread.daemon = True
+        fetch_thread.start()
 
-    socketio.run(app, debug=True)
+        socketio.run(app, host=args.host, port=args.port, debug=debug)
@@ -0,0 +1,388 @@
+import argparse
+import glob
+import json
+import mmap
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pytz
+
+from detector_parser import ARCHIVE_ELEMENTS, ID_FIELDS
+
+# ----------------------------
+# 📍 Columnar Segment Archive
+# ----------------------------
+# One segment per day (or hour) holds every poll for that period:
+#
+#   <name>.seg  append-only frames, one per poll
+#   <name>.ids  detector dictionary, one "detectorId<TAB>stationId" per line
+#   <name>.idx  timestamp index, fixed-width (timestamp, offset) pairs
+#
+# A frame is a fixed header followed by a payload of fixed-width columns:
+# int32 dictionary indices, then one float32 column per field (NaN where
+# the upstream value was missing). The payload is optionally zlib
+# compressed and always CRC-checked, so a torn write at the end of a
+# segment is detected and truncated when the segment is reopened.
+
+local_timezone = pytz.timezone("America/Los_Angeles")
+
+# Value columns of a frame, in the order the collector requests them
+ARCHIVE_FIELDS = tuple(key for key in ARCHIVE_ELEMENTS if key not in ID_FIELDS)
+
+FRAME_MAGIC = b"TSEG"
+FRAME_HEADER = struct.Struct("<4sB3xqIII")  # magic, codec, timestamp, rows, payload bytes, crc32
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+INDEX_DTYPE = np.dtype([("timestamp", "<i8"), ("offset", "<i8")])
+
+SEGMENT_FORMATS = {
+    "daily": "%Y-%m-%d",
+    "hourly": "%Y-%m-%d_%H",
+}
+
+
+def segment_name(timestamp, segment="daily"):
+    """Segment file stem for an epoch-seconds timestamp, in local time."""
+    return datetime.fromtimestamp(timestamp, local_timezone).strftime(SEGMENT_FORMATS[segment])
+
+
+def _to_epoch(timestamp):
+    if isinstance(timestamp, datetime):
+        return int(timestamp.timestamp())
+    return int(timestamp)
+
+
+def _scan_frames(buffer, size):
+    """Yield (offset, timestamp, total_length) for every intact frame."""
+    offset = 0
+    while offset + FRAME_HEADER.size <= size:
+        magic, codec, timestamp, rows, length, crc = FRAME_HEADER.unpack_from(buffer, offset)
+        end = offset + FRAME_HEADER.size + length
+        if magic != FRAME_MAGIC or end > size:
+            return
+        if zlib.crc32(buffer[offset + FRAME_HEADER.size:end]) != crc:
+            return
+        yield offset, timestamp, end - offset
+        offset = end
+
+
+# ----------------------------
+# 📍 Writer
+# ----------------------------
+class SegmentWriter:
+    """Crash-safe appender for a single segment."""
+
+    def __init__(self, stem, compression="zlib", fsync=True):
+        self.stem = stem
+        self.codec = CODEC_ZLIB if compression == "zlib" else CODEC_RAW
+        self.fsync = fsync
+
+        self.detector_ids = []
+        self._dictionary = {}
+        self._recover()
+
+        self._seg = open(stem + ".seg", "ab")
+        self._ids = open(stem + ".ids", "a")
+        self._idx = open(stem + ".idx", "ab")
+
+    def _recover(self):
+        """Drop a torn tail left by a crash and rebuild the index if needed."""
+        seg_path, ids_path, idx_path = self.stem + ".seg", self.stem + ".ids", self.stem + ".idx"
+
+        if os.path.exists(ids_path):
+            with open(ids_path, "rb+") as f:
+                content = f.read()
+                complete = content[:content.rfind(b"\n") + 1]
+                if len(complete) != len(content):
+                    f.truncate(len(complete))
+            for line in complete.decode().splitlines():
+                detector_id, _, station_id = line.partition("\t")
+                self._dictionary[detector_id] = len(self.detector_ids)
+                self.detector_ids.append((detector_id, station_id))
+
+        entries = []
+        if os.path.exists(seg_path) and os.path.getsize(seg_path):
+            with open(seg_path, "rb+") as f:
+                size = os.path.getsize(seg_path)
+                end = 0
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for offset, ts, length in _scan_frames(mm, size):
+                        entries.append((offset, ts))
+                        end = offset + length
+                if end != size:
+                    f.truncate(end)
+
+        # Any difference, even a partial trailing record, would misalign
+        # later appends, so the index is rewritten from the frames
+        index = np.array([(ts, offset) for offset, ts in entries], dtype=INDEX_DTYPE).tobytes()
+        existing = b""
+        if os.path.exists(idx_path):
+            with open(idx_path, "rb") as f:
+                existing = f.read()
+        if existing != index:
+            with open(idx_path, "wb") as f:
+                f.write(index)
+
+    def append(self, timestamp, records):
+        """Append one poll (list of detector dicts) as a single frame."""
+        ids = [(record.get("detectorId"), record.get("stationId")) for record in records]
+        values = np.array(
+            [[record.get(field) for field in ARCHIVE_FIELDS] for record in records],
+            dtype=np.float32
+        ).reshape(-1, len(ARCHIVE_FIELDS))
+        self.append_columns(timestamp, ids, values)
+
+    def append_columns(self, timestamp, ids, values):
+        """Append one poll given (detectorId, stationId) pairs and a [rows, fields] array."""
+        new_ids = []
+        indices = np.empty(len(ids), dtype=np.int32)
+        for i, (detector_id, station_id) in enumerate(ids):
+            index = self._dictionary.get(detector_id)
+            if index is None:
+                index = len(self.detector_ids)
+                self._dictionary[detector_id] = index
+                self.detector_ids.append((detector_id, station_id))
+                new_ids.append(f"{detector_id}\t{station_id}\n")
+            indices[i] = index
+
+        # Dictionary first, so every index a frame refers to is on disk
+        if new_ids:
+            self._ids.write("".join(new_ids))
+            self._flush(self._ids)
+
+        payload = indices.astype("<i4").tobytes() + np.ascontiguousarray(values.T, dtype="<f4").tobytes()
+        if self.codec == CODEC_ZLIB:
+            payload = zlib.compress(payload, 6)
+
+        offset = self._seg.tell()
+        header = FRAME_HEADER.pack(FRAME_MAGIC, self.codec, _to_epoch(timestamp), len(indices), len(payload), zlib.crc32(payload))
+        self._seg.write(header + payload)
+        self._flush(self._seg)
+
+        self._idx.write(np.array([(_to_epoch(timestamp), offset)], dtype=INDEX_DTYPE).tobytes())
+        self._flush(self._idx)
+
+    def _flush(self, f):
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def close(self):
+        for f in (self._seg, self._ids, self._idx):
+            f.close()
+
+
+class ArchiveWriter:
+    """Route polls to the daily/hourly segment their timestamp falls in."""
+
+    def __init__(self, directory, segment="daily", compression="zlib", fsync=True):
+        self.directory = directory
+        self.segment = segment
+        self.compression = compression
+        self.fsync = fsync
+        self._current = None
+        self._current_name = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _writer_for(self, timestamp):
+        name = segment_name(_to_epoch(timestamp), self.segment)
+        if name != self._current_name:
+            if self._current is not None:
+                self._current.close()
+            self._current = SegmentWriter(os.path.join(self.directory, name), self.compression, self.fsync)
+            self._current_name = name
+        return self._current
+
+    def append(self, timestamp, records):
+        self._writer_for(timestamp).append(timestamp, records)
+        return self._current_name
+
+    def append_columns(self, timestamp, ids, values):
+        """Append (detectorId, stationId) pairs and a [rows, ARCHIVE_FIELDS] array."""
+        self._writer_for(timestamp).append_columns(timestamp, ids, values)
+        return self._current_name
+
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+            self._current_name = None
+
+
+# ----------------------------
+# 📍 Reader
+# ----------------------------
+class SegmentReader:
+    """Memory-mapped, read-only view of one segment."""
+
+    def __init__(self, stem):
+        self.stem = stem
+
+        with open(stem + ".ids") as f:
+            self.detector_ids = [tuple(line.rstrip("\n").split("\t", 1)) for line in f if line.endswith("\n")]
+
+        self._file = open(stem + ".seg", "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+        index = np.fromfile(stem + ".idx", dtype=INDEX_DTYPE) if os.path.exists(stem + ".idx") else np.empty(0, INDEX_DTYPE)
+        # Ignore index entries past the last intact byte (e.g. a writer mid-append)
+        index = index[index["offset"] + FRAME_HEADER.size <= size]
+        if not len(index) and size:
+            index = np.array([(ts, offset) for offset, ts, _ in _scan_frames(self._mm, size)], dtype=INDEX_DTYPE)
+        self.index = index
+
+    def frames(self, start=None, end=None):
+        """Yield (timestamp, indices, values[rows, fields]) for start <= t < end."""
+        timestamps = self.index["timestamp"]
+        lo = 0 if start is None else np.searchsorted(timestamps, start, side="left")
+        hi = len(timestamps) if end is None else np.searchsorted(timestamps, end, side="left")
+        view = memoryview(self._mm)
+        for offset in self.index["offset"][lo:hi]:
+            magic, codec, timestamp, rows, length, crc = FRAME_HEADER.unpack_from(self._mm, offset)
+            body = offset + FRAME_HEADER.size
+            if magic != FRAME_MAGIC or body + length > len(self._mm):
+                break
+            payload = view[body:body + length]
+            if codec == CODEC_ZLIB:
+                payload = zlib.decompress(payload)
+            indices = np.frombuffer(payload, dtype="<i4", count=rows)
+            values = np.frombuffer(payload, dtype="<f4", offset=4 * rows).reshape(len(ARCHIVE_FIELDS), rows).T
+            yield timestamp, indices, values
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+
+class ArchiveReader:
+    """Read a time range across segments into dense [time, detector] arrays."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def segments(self):
+        return sorted(
+            path[:-len(".seg")]
+            for path in glob.glob(os.path.join(self.directory, "*.seg"))
+        )
+
+    def read(self, start=None, end=None, detectors=None, fields=ARCHIVE_FIELDS):
+        """Return timestamps, detector ids and one float32 [T, D] array per field.
+
+        `start`/`end` are datetimes or epoch seconds (end exclusive). With
+        `detectors` the columns follow that order; otherwise every detector
+        seen in the range is returned in first-seen order.
+        """
+        start = None if start is None else _to_epoch(start)
+        end = None if end is None else _to_epoch(end)
+        field_columns = [ARCHIVE_FIELDS.index(field) for field in fields]
+
+        columns = {detector_id: i for i, detector_id in enumerate(detectors)} if detectors is not None else {}
+        timestamps, frames = [], []
+
+        for stem in self.segments():
+            name = os.path.basename(stem)
+            if not self._overlaps(name, start, end):
+                continue
+            reader = SegmentReader(stem)
+            try:
+                # Dictionary index -> output column (-1 when not requested)
+                lookup = np.full(len(reader.detector_ids) + 1, -1, dtype=np.intp)
+                for i, (detector_id, _) in enumerate(reader.detector_ids):
+                    if detectors is None and detector_id not in columns:
+                        columns[detector_id] = len(columns)
+                    lookup[i] = columns.get(detector_id, -1)
+
+                for timestamp, indices, values in reader.frames(start, end):
+                    cols = lookup[indices]
+                    keep = cols >= 0
+                    timestamps.append(timestamp)
+                    frames.append((cols[keep], values[keep][:, field_columns]))
+                # Drop views into the mapping before it is closed
+                indices = values = None
+            finally:
+                reader.close()
+
+        result = {
+            "timestamps": np.array(timestamps, dtype=np.int64),
+            "detector_ids": list(columns),
+        }
+        for j, field in enumerate(fields):
+            array = np.full((len(timestamps), len(columns)), np.nan, dtype=np.float32)
+            for t, (cols, values) in enumerate(frames):
+                array[t, cols] = values[:, j]
+            result[field] = array
+        return result
+
+    @staticmethod
+    def _overlaps(name, start, end):
+        for segment, fmt in SEGMENT_FORMATS.items():
+            try:
+                opened = local_timezone.localize(datetime.strptime(name, fmt))
+            except ValueError:
+                continue
+            # One extra hour of slack for DST changeover days
+            span = 90000 if segment == "daily" else 7200
+            first = int(opened.timestamp())
+            return (end is None or first < end) and (start is None or first + span > start)
+        return False
+
+
+# ----------------------------
+# 📍 JSON Import
+# ----------------------------
+def _load_json_snapshot(path):
+    """Parse one legacy per-poll JSON file into (timestamp, columns)."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    timestamp = int(local_timezone.localize(datetime.strptime(stem, "%Y-%m-%d_%H-%M-%S")).timestamp())
+    with open(path) as f:
+        records = json.load(f)
+    ids = [(r.get("detectorId"), r.get("stationId")) for r in records]
+    values = np.array([[r.get(field) for field in ARCHIVE_FIELDS] for r in records], dtype=np.float32)
+    return timestamp, ids, values.reshape(-1, len(ARCHIVE_FIELDS))
+
+
+def convert_json_archive(json_directory, archive_directory, segment="daily", compression="zlib", workers=None):
+    """Import a directory of legacy per-poll JSON files into segments.
+
+    Files are parsed in parallel worker processes and appended in timestamp
+    order by this process. Returns the number of polls imported.
+    """
+    paths = []
+    for path in glob.glob(os.path.join(json_directory, "*.json")):
+        try:
+            datetime.strptime(os.path.splitext(os.path.basename(path))[0], "%Y-%m-%d_%H-%M-%S")
+        except ValueError:
+            continue
+        paths.append(path)
+    paths.sort()
+
+    writer = ArchiveWriter(archive_directory, segment=segment, compression=compression, fsync=False)
+    imported = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for timestamp, ids, values in pool.map(_load_json_snapshot, paths, chunksize=64):
+                writer.append_columns(timestamp, ids, values)
+                imported += 1
+    finally:
+        writer.close()
+    return imported
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import legacy JSON polls into the segment archive.")
+    parser.add_argument("json_directory")
+    parser.add_argument("archive_directory")
+    parser.add_argument("--segment", choices=sorted(SEGMENT_FORMATS), default="daily")
+    parser.add_argument("--compression", choices=["zlib", "none"], default="zlib")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    count = convert_json_archive(args.json_directory, args.archive_directory, args.segment, args.compression, args.workers)
+    print(f"Imported {count} polls into {args.archive_directory}")
@@ -0,0 +1,95 @@
+import argparse
+import math
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forecast_engine import BaselineModel, Forecaster, TorchScriptModel
+from history_store import HistoryStore
+
+# ----------------------------
+# 📍 Forecast Latency per Tick
+# ----------------------------
+# Fills a HistoryStore with synthetic polls for each detector count and
+# times one Forecaster.update() per tick: window gather, one batched model
+# call and building the emitted payload. The same model is also called
+# once per detector to show what batching saves.
+#
+#   python benchmarks/bench_forecast.py --detectors 100 900 3600
+#   python benchmarks/bench_forecast.py --torchscript model.pt --input-minutes 30
+
+
+def synthetic_store(detectors, steps, time_step_minutes, seed=0):
+    rng = np.random.default_rng(seed)
+    store = HistoryStore(steps, time_step_minutes, initial_detectors=detectors)
+    speed = rng.uniform(30, 70, detectors)
+    for t in range(steps):
+        speed = np.clip(speed + rng.normal(0, 2, detectors), 0, 80)
+        count = rng.poisson(5, detectors)
+        occupancy = rng.uniform(0, 30, detectors)
+        missing = rng.random(detectors) < 0.02
+        store.append(f"t{t}", [
+            {
+                "stationId": f"s{i // 3}",
+                "detectorId": f"s{i // 3}_{i % 3 + 1}",
+                "vehicleSpeed": None if missing[i] else float(speed[i]),
+                "vehicleCount": int(count[i]),
+                "vehicleOccupancy": float(occupancy[i]),
+            }
+            for i in range(detectors)
+        ])
+    return store
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), max(timings)
+
+
+def bench(model, detectors, time_step_minutes, horizons, repeat):
+    store = synthetic_store(detectors, model.input_steps, time_step_minutes)
+    forecaster = Forecaster(store, model, time_step_minutes, horizons)
+
+    tick = iter(range(10 ** 9))
+    per_tick, worst = timed(lambda: forecaster.update(next(tick)), repeat)
+
+    _, _, _, window = store.window(model.input_steps)
+    batched, _ = timed(lambda: model.predict(window), repeat)
+    looped, _ = timed(lambda: [model.predict(window[i:i + 1]) for i in range(len(window))], max(1, repeat // 5))
+
+    print(
+        f"{detectors:>6} detectors | tick {per_tick * 1000:7.2f} ms (max {worst * 1000:7.2f}) | "
+        f"model batched {batched * 1000:7.2f} ms | per-detector {looped * 1000:8.1f} ms | x{looped / batched:.0f}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Forecast latency per tick against detector count.")
+    parser.add_argument("--detectors", nargs="*", type=int, default=[100, 900, 3600, 10000])
+    parser.add_argument("--time-step-minutes", type=float, default=0.5)
+    parser.add_argument("--input-minutes", type=float, default=15)
+    parser.add_argument("--horizons", nargs="*", type=int, default=[5, 15, 30])
+    parser.add_argument("--torchscript", help="benchmark this TorchScript model instead of the baseline")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    input_steps = max(2, math.ceil(args.input_minutes / args.time_step_minutes))
+    horizon_steps = max(math.ceil(h / args.time_step_minutes) for h in args.horizons)
+    if args.torchscript:
+        model = TorchScriptModel(args.torchscript, input_steps, horizon_steps, args.threads)
+    else:
+        model = BaselineModel(input_steps, horizon_steps)
+
+    print(f"{type(model).__name__}: {input_steps} input steps -> {horizon_steps} steps, horizons {args.horizons} min")
+    for detectors in args.detectors:
+        bench(model, detectors, args.time_step_minutes, args.horizons, args.repeat)
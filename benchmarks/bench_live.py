@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import threading
+import time
+
+import numpy as np
+import socketio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_startup import free_port, launch_app, scratch_dir, stop_app
+from detector_parser import LIVE_FIELDS, parse_detector_reply
+from forecast_engine import Forecaster, load_model
+from history_store import HistoryStore
+from live_push import _encode, msgpack
+from replay import ReplaySource
+from station_aggregates import StationAggregator
+from tmdd_standin import TmddStandIn
+
+# ----------------------------
+# 📍 Live Pipeline Load Benchmark
+# ----------------------------
+# Two parts:
+#
+#   hot path   in-process: parse one reply and serialize every event a poll
+#              emits (new_data, delta as JSON and msgpack, station_summary,
+#              forecast), per detector count
+#   push       app.py in a subprocess fed by the TMDD stand-in (or by
+#              `--mode replay` over an archive), with N Socket.IO clients
+#              on legacy `new_data` snapshots or, with --subscribe, on the
+#              all-detector delta room; reports tick-to-client latency
+#              percentiles and server RSS per connected client
+#
+#   python benchmarks/bench_live.py --detectors 900 3600 --clients 1 10 50
+#   python benchmarks/bench_live.py --clients 10 50 --subscribe
+#   python benchmarks/bench_live.py --replay ~/Desktop/json_data/archive --clients 10
+#
+# Latency is measured from the `tick` epoch the app puts in every frame
+# (the scheduler tick the poll was fetched on), so it includes the (local)
+# SOAP round trip, parsing, rollups and the emit, however long they take.
+# All clients share this process; at high N their own decoding adds to the
+# numbers, so compare runs of the same N.
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def bench_hot_path(detectors, repeat):
+    config = {"time_step_minutes": 0.5, "sensor_info_minutes_back": 15}
+    standin = TmddStandIn(detectors=detectors)
+    history = HistoryStore.from_config(config, initial_detectors=detectors)
+    aggregator = StationAggregator.from_config(config)
+    forecaster = Forecaster(history, load_model(config, 0.5), 0.5)
+
+    # Two polls so deltas and rolling windows have something to diff
+    previous = None
+    for tick in range(2):
+        reply = standin.next_reply()
+        columns = parse_detector_reply(reply, LIVE_FIELDS, parser="stream")
+        records = columns.records(LIVE_FIELDS)
+        history.append(f"t{tick}", records)
+        summary = aggregator.update(f"t{tick}", columns)
+        forecast = forecaster.update(f"t{tick}")
+        if tick == 0:
+            previous = {r["detectorId"]: r for r in records}
+
+    parse_time, _ = timed(lambda: parse_detector_reply(reply, LIVE_FIELDS, parser="stream").records(LIVE_FIELDS), repeat)
+    changed = [r for r in records if previous.get(r["detectorId"]) != r]
+    delta = {"seq": 2, "timestamp": "t1", "tick": 0.0, "data": changed, "removed": []}
+
+    events = {
+        "new_data": lambda: json.dumps({"timestamp": "t1", "tick": 0.0, "data": records}),
+        "delta": lambda: json.dumps(delta),
+        "station_summary": lambda: json.dumps(summary),
+        "forecast": lambda: json.dumps(forecast),
+    }
+    if msgpack is not None:
+        events["delta (msgpack)"] = lambda: _encode(delta)
+
+    print(f"\n{detectors} detectors: parse {parse_time * 1000:.1f} ms ({len(reply) / 1e6:.2f} MB reply)")
+    for event, serialize in events.items():
+        seconds, body = timed(serialize, repeat)
+        print(f"  {event:>18} serialize {seconds * 1000:7.2f} ms  {len(body) / 1e3:8.1f} kB")
+
+
+def rss_bytes(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+class Clients:
+    """Socket.IO clients recording how long after its tick each poll arrives.
+
+    With `subscribe` they join the all-detector delta room and time `delta`
+    frames instead of `new_data` snapshots.
+    """
+
+    def __init__(self, url, interval, subscribe=False):
+        self.url = url
+        self.interval = interval
+        self.subscribe = subscribe
+        self.clients = []
+        self.latencies = []
+        self._lock = threading.Lock()
+
+    def add(self, count):
+        for _ in range(count):
+            client = socketio.Client(reconnection=False)
+            client.on("delta" if self.subscribe else "new_data", self._on_frame)
+            client.connect(self.url, transports=["polling"])
+            if self.subscribe:
+                client.emit("subscribe", {})
+            self.clients.append(client)
+
+    def _on_frame(self, message):
+        received = time.time()
+        if message.get("tick") is None:
+            return
+        with self._lock:
+            self.latencies.append(received - message["tick"])
+
+    def collect(self, polls):
+        with self._lock:
+            self.latencies = []
+        time.sleep(polls * self.interval)
+        with self._lock:
+            return list(self.latencies)
+
+    def close(self):
+        for client in self.clients:
+            client.disconnect()
+
+
+def bench_push(client_counts, polls, detectors, interval, replay_directory, subscribe=False):
+    port = free_port()
+    if replay_directory:
+        # Same spacing the app will derive for this archive and speed
+        speed = ReplaySource(replay_directory).interval_seconds * 60 / interval
+        workdir = scratch_dir()
+        process = launch_app(workdir, port, "--mode", "replay", "--replay", replay_directory,
+                             "--speed", str(speed), "--loop", "--no-debug")
+        standin = None
+    else:
+        standin = TmddStandIn(detectors=detectors).start()
+        # The WSDL cache goes under workdir, removed with it below
+        workdir = scratch_dir(wsdl_url=standin.wsdl_url, wsdl_cache_dir="wsdl_cache", time_step_minutes=interval / 60)
+        process = launch_app(workdir, port, "--no-debug")
+
+    clients = Clients(f"http://127.0.0.1:{port}", interval, subscribe)
+    try:
+        # Wait for the first poll before taking the baseline
+        probe = Clients(clients.url, interval)
+        for _ in range(100):
+            try:
+                probe.add(1)
+                break
+            except socketio.exceptions.ConnectionError:
+                time.sleep(0.2)
+        if not probe.collect(3):
+            print("No polls arrived; is the app starting?")
+            return
+        probe.close()
+        baseline = rss_bytes(process.pid)
+
+        print(f"\n{'delta' if subscribe else 'new_data'} clients")
+        print(f"{'clients':>8} | {'pushes':>7} | {'p50':>7} {'p95':>7} {'p99':>7} {'max':>7} ms | {'RSS':>7} MB | per client")
+        for count in client_counts:
+            clients.add(count - len(clients.clients))
+            latencies = np.array(clients.collect(polls)) * 1000
+            rss = rss_bytes(process.pid)
+            if not len(latencies):
+                print(f"{count:>8} | no pushes received")
+                continue
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            print(
+                f"{count:>8} | {len(latencies):>7} | {p50:7.1f} {p95:7.1f} {p99:7.1f} {latencies.max():7.1f} ms | "
+                f"{rss / 1e6:7.1f} MB | {(rss - baseline) / count / 1e3:7.1f} kB"
+            )
+    finally:
+        clients.close()
+        stop_app(process)
+        shutil.rmtree(workdir, ignore_errors=True)
+        if standin is not None:
+            standin.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hot-path timings and Socket.IO push latency for the live pipeline.")
+    parser.add_argument("--detectors", nargs="*", type=int, default=[900, 3600])
+    parser.add_argument("--clients", nargs="*", type=int, default=[1, 10, 50])
+    parser.add_argument("--polls", type=int, default=5, help="polls measured per client count")
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between polls during the push test")
+    parser.add_argument("--replay", help="drive the push test from this archive via `app.py --mode replay`")
+    parser.add_argument("--subscribe", action="store_true", help="push-test clients subscribe to delta frames")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--skip-push", action="store_true", help="only run the in-process hot-path timings")
+    args = parser.parse_args()
+
+    for detectors in args.detectors:
+        bench_hot_path(detectors, args.repeat)
+    if not args.skip_push:
+        bench_push(sorted(args.clients), args.polls, args.detectors[0], args.interval, args.replay, args.subscribe)
@@ -0,0 +1,92 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zeep import Client, Settings
+
+from detector_parser import ARCHIVE_ELEMENTS, fetch_detector_records
+from fixtures import ReplayTransport, load_fixture, save_fixture, synthesize_detector_response
+from soap_settings import soap_parameters
+
+# ----------------------------
+# 📍 zeep vs Streaming Parser
+# ----------------------------
+# Runs both parser paths over the same recorded (or synthesized) replies,
+# checks they agree and reports per-call time and peak traced memory.
+#
+#   python benchmarks/bench_parser.py --fixture responses/*.xml
+#   python benchmarks/bench_parser.py --detectors 900 3600
+#   python benchmarks/bench_parser.py --record responses/live.xml
+#
+# Benchmarks run offline against the shipped subset WSDL; only --record
+# talks to the live service.
+
+WSDL_URL = "https://colondexsrv.its.nv.gov/tmddws/TmddWS.svc?singleWsdl"
+SUBSET_WSDL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmdd_detector_subset.wsdl")
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def bench(wsdl, label, content, repeat):
+    transport = ReplayTransport(content)
+    client = Client(wsdl=wsdl, settings=Settings(strict=False, xml_huge_tree=True), transport=transport)
+    params = soap_parameters
+
+    zeep_records = fetch_detector_records(client, params, ARCHIVE_ELEMENTS, parser="zeep")
+    stream_records = fetch_detector_records(client, params, ARCHIVE_ELEMENTS, parser="stream")
+    identical = zeep_records == stream_records
+
+    results = {}
+    for parser in ("zeep", "stream"):
+        results[parser] = measure(lambda: fetch_detector_records(client, params, ARCHIVE_ELEMENTS, parser=parser), repeat)
+
+    zeep_time, zeep_peak = results["zeep"]
+    stream_time, stream_peak = results["stream"]
+    print(
+        f"{label:>24} | {len(zeep_records):>6} rows | identical={identical} | "
+        f"zeep {zeep_time * 1000:8.1f} ms {zeep_peak / 1e6:7.1f} MB | "
+        f"stream {stream_time * 1000:8.1f} ms {stream_peak / 1e6:7.1f} MB | "
+        f"x{zeep_time / stream_time:.1f}"
+    )
+    return identical
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the zeep and streaming detector parsers.")
+    parser.add_argument("--wsdl", help="WSDL URL or local file (default: the subset WSDL, or the live service for --record)")
+    parser.add_argument("--fixture", nargs="*", default=[], help="recorded raw reply files")
+    parser.add_argument("--detectors", nargs="*", type=int, default=[], help="synthesize replies of these sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--record", help="save one live raw reply to this path and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        client = Client(wsdl=args.wsdl or WSDL_URL, settings=Settings(strict=False, xml_huge_tree=True))
+        with client.settings(raw_response=True):
+            response = client.service.dlDetectorDataRequest(**soap_parameters)
+        save_fixture(args.record, response.content)
+        print(f"Recorded {len(response.content)} bytes to {args.record}")
+        sys.exit(0)
+
+    cases = [(os.path.basename(path), load_fixture(path)) for path in args.fixture]
+    cases += [(f"synthetic-{n}", synthesize_detector_response(n)) for n in (args.detectors or ([] if cases else [900, 3600]))]
+
+    all_identical = all([bench(args.wsdl or SUBSET_WSDL, label, content, args.repeat) for label, content in cases])
+    sys.exit(0 if all_identical else 1)
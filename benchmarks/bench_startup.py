@@ -0,0 +1,134 @@
+import argparse
+import json
+import os
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+import socketio
+
+from tmdd_standin import TmddStandIn
+
+# ----------------------------
+# 📍 Cold-Start Benchmark
+# ----------------------------
+# Starts `app.py` in a scratch directory against the local TMDD stand-in
+# (tmdd_standin.py) and reports, from process launch:
+#
+#   first request  first 200 from /config
+#   first emit     first `new_data` carrying detectors on a Socket.IO client
+#
+# Each run is done twice: with an empty WSDL cache (first ever start) and
+# with the cache the first run left behind (every restart after that).
+#
+#   python benchmarks/bench_startup.py --runs 3 --detectors 900
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    import socket
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def scratch_dir(**overrides):
+    """Working directory holding the repo's config with `overrides` applied."""
+    workdir = tempfile.mkdtemp(prefix="bench_app_")
+    with open(os.path.join(REPO, "config.json")) as f:
+        config = json.load(f)
+    config.update(overrides)
+    with open(os.path.join(workdir, "config.json"), "w") as f:
+        json.dump(config, f)
+    os.symlink(os.path.join(REPO, "data"), os.path.join(workdir, "data"))
+    return workdir
+
+
+def launch_app(workdir, port, *args):
+    """Start app.py in `workdir`; stop it with stop_app()."""
+    return subprocess.Popen(
+        [sys.executable, os.path.join(REPO, "app.py"), "--port", str(port), *args],
+        cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"),
+        start_new_session=True  # in case `--debug` starts the reloader; stop its child too
+    )
+
+
+def stop_app(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    process.wait()
+
+
+def time_startup(wsdl_url, cache_dir, timeout):
+    """Launch app.py once; returns (first_request_s, first_emit_s)."""
+    workdir = scratch_dir(wsdl_url=wsdl_url, wsdl_cache_dir=cache_dir, time_step_minutes=1)
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+
+    started = time.perf_counter()
+    process = launch_app(workdir, port, "--no-debug")
+    first_request = first_emit = None
+    client = socketio.Client()
+    emitted = threading.Event()
+
+    @client.on("new_data")
+    def on_new_data(message):
+        if message.get("data") and not emitted.is_set():
+            emitted.set()
+
+    try:
+        while first_request is None and time.perf_counter() - started < timeout:
+            try:
+                if requests.get(f"{base}/config", timeout=1).ok:
+                    first_request = time.perf_counter() - started
+            except requests.ConnectionError:
+                time.sleep(0.01)
+
+        if first_request is not None:
+            client.connect(base, transports=["polling"])
+            if emitted.wait(max(0.0, timeout - (time.perf_counter() - started))):
+                first_emit = time.perf_counter() - started
+    finally:
+        if client.connected:
+            client.disconnect()
+        stop_app(process)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return first_request, first_emit
+
+
+def report(label, samples):
+    requests_s = [r for r, _ in samples if r is not None]
+    emits_s = [e for _, e in samples if e is not None]
+    first_request = f"{statistics.median(requests_s) * 1000:8.0f} ms" if requests_s else "   timeout"
+    first_emit = f"{statistics.median(emits_s) * 1000:8.0f} ms" if emits_s else "   timeout"
+    print(f"{label:>12} | first request {first_request} | first emit {first_emit} | {len(samples)} run(s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time from launching app.py to first request and first emit.")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--detectors", type=int, default=900)
+    parser.add_argument("--wsdl-delay", type=float, default=0.5, help="seconds the stand-in takes to serve the WSDL")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    standin = TmddStandIn(detectors=args.detectors, wsdl_delay=args.wsdl_delay).start()
+    cache_root = tempfile.mkdtemp(prefix="bench_wsdl_cache_")
+    try:
+        cold, warm = [], []
+        for i in range(args.runs):
+            cache_dir = os.path.join(cache_root, str(i))
+            cold.append(time_startup(standin.wsdl_url, cache_dir, args.timeout))
+            warm.append(time_startup(standin.wsdl_url, cache_dir, args.timeout))
+        report("empty cache", cold)
+        report("warm cache", warm)
+    finally:
+        standin.stop()
+        shutil.rmtree(cache_root, ignore_errors=True)
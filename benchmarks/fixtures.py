@@ -0,0 +1,80 @@
+import os
+import random
+
+import requests
+from zeep.transports import Transport
+
+# ----------------------------
+# 📍 TMDD Response Fixtures
+# ----------------------------
+# Synthetic `dlDetectorDataRequest` replies shaped like the ITS feed, plus a
+# zeep transport that answers every call with a canned reply so the full
+# zeep path can run offline.
+
+SOAP_ENV = "http://schemas.xmlsoap.org/soap/envelope/"
+TMDD_NS = "http://www.tmdd.org/303/messages"
+
+
+def synthesize_detector_response(detectors=900, lanes_per_station=3, seed=0, missing_rate=0.02):
+    """Return SOAP envelope bytes with `detectors` detector-data-detail rows."""
+    rng = random.Random(seed)
+    details = []
+    for i in range(detectors):
+        station_id = f"{100 + i // lanes_per_station}_1_{30 + i % 17}"
+        detector_id = f"{station_id}_{i % lanes_per_station + 1}"
+        bins = [rng.randint(0, 6) for _ in range(4)]
+        values = {
+            "vehicle-count": sum(bins),
+            "vehicle-occupancy": rng.randint(0, 40),
+            "vehicle-speed": rng.randint(20, 75),
+            "vehicle-count-bin1": bins[0],
+            "vehicle-count-bin2": bins[1],
+            "vehicle-count-bin3": bins[2],
+            "vehicle-count-bin4": bins[3],
+        }
+        fields = "".join(
+            f"<{name}>{value}</{name}>"
+            for name, value in values.items()
+            if rng.random() >= missing_rate
+        )
+        details.append(
+            f"<detector-data-detail><detector-id>{detector_id}</detector-id>"
+            f"<station-id>{station_id}</station-id>{fields}</detector-data-detail>"
+        )
+
+    return (
+        f'<?xml version="1.0" encoding="utf-8"?>'
+        f'<s:Envelope xmlns:s="{SOAP_ENV}"><s:Body>'
+        f'<tmdd:detectorDataMsg xmlns:tmdd="{TMDD_NS}"><detector-data-item>'
+        f'<organization-information><organization-id>its.nv.gov</organization-id></organization-information>'
+        f'<detector-list>{"".join(details)}</detector-list>'
+        f'</detector-data-item></tmdd:detectorDataMsg>'
+        f'</s:Body></s:Envelope>'
+    ).encode()
+
+
+def load_fixture(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def save_fixture(path, content):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+class ReplayTransport(Transport):
+    """zeep transport that answers every SOAP call with `content`."""
+
+    def __init__(self, content, **kwargs):
+        super().__init__(**kwargs)
+        self.content = content
+
+    def post_xml(self, address, envelope, headers):
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "text/xml; charset=utf-8"
+        response._content = self.content
+        response.encoding = "utf-8"
+        return response
@@ -0,0 +1,117 @@
+import argparse
+import glob
+import itertools
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures import load_fixture, synthesize_detector_response
+
+# ----------------------------
+# 📍 Local TMDD Stand-In
+# ----------------------------
+# A tiny HTTP server that looks enough like the ITS TMDD service for the
+# collectors and app.py to run against it:
+#
+#   GET  ...?singleWsdl   the subset WSDL, with its address rewritten to us
+#   POST ...              the next reply: recorded fixtures in turn, or a
+#                         freshly synthesized one (new seed per call, so
+#                         consecutive polls differ)
+#
+#   python benchmarks/tmdd_standin.py --port 8089 --detectors 900
+#   python benchmarks/tmdd_standin.py --port 8089 --fixture responses/*.xml
+#
+# then set "wsdl_url" in config.json to http://127.0.0.1:8089/tmddws/TmddWS.svc?singleWsdl
+
+SUBSET_WSDL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmdd_detector_subset.wsdl")
+SUBSET_ADDRESS = "http://127.0.0.1:8089/tmddws/TmddWS.svc"
+SERVICE_PATH = "/tmddws/TmddWS.svc"
+
+
+class TmddStandIn:
+    """Serve the subset WSDL and canned detector replies on a background thread."""
+
+    def __init__(self, host="127.0.0.1", port=0, fixtures=None, detectors=900,
+                 wsdl_path=SUBSET_WSDL, wsdl_delay=0.0, reply_delay=0.0):
+        self.detectors = detectors
+        self.wsdl_delay = wsdl_delay
+        self.reply_delay = reply_delay
+        self.requests = 0
+        self._fixtures = itertools.cycle(fixtures) if fixtures else None
+        self._lock = threading.Lock()
+
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_port}{SERVICE_PATH}"
+        with open(wsdl_path, "rb") as f:
+            self.wsdl = f.read().replace(SUBSET_ADDRESS.encode(), self.url.encode())
+
+    @property
+    def wsdl_url(self):
+        return self.url + "?singleWsdl"
+
+    def next_reply(self):
+        with self._lock:
+            self.requests += 1
+            seed = self.requests
+            if self._fixtures is not None:
+                return next(self._fixtures)
+        return synthesize_detector_response(self.detectors, seed=seed)
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real service
+
+            def do_GET(self):
+                time.sleep(standin.wsdl_delay)
+                self._send(standin.wsdl, "text/xml")
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                time.sleep(standin.reply_delay)
+                self._send(standin.next_reply(), "text/xml; charset=utf-8")
+
+            def _send(self, body, content_type):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="tmdd-standin", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the TMDD SOAP service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--fixture", nargs="*", default=[], help="recorded raw replies to serve in turn")
+    parser.add_argument("--detectors", type=int, default=900, help="synthesized reply size (without --fixture)")
+    parser.add_argument("--reply-delay", type=float, default=0.0, help="seconds to wait before each reply")
+    args = parser.parse_args()
+
+    fixtures = [load_fixture(path) for pattern in args.fixture for path in sorted(glob.glob(pattern))]
+    standin = TmddStandIn(args.host, args.port, fixtures, args.detectors, reply_delay=args.reply_delay)
+    source = f"{len(fixtures)} recorded replies" if fixtures else f"synthesized replies of {args.detectors} detectors"
+    print(f"TMDD stand-in serving {source}; WSDL at {standin.wsdl_url}")
+    try:
+        standin.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,192 @@
+import io
+
+import numpy as np
+from lxml import etree
+
+from json_values import json_number
+
+# ----------------------------
+# 📍 Detector Response Parsing
+# ----------------------------
+# Two interchangeable ways of turning a `dlDetectorDataRequest` reply into
+# detector dicts:
+#
+#   "zeep"    let zeep build its object graph, then walk it with getattr
+#   "stream"  ask zeep for the raw HTTP reply and iterparse the
+#             `detector-data-detail` elements straight into preallocated
+#             columns, clearing each element as soon as it is read
+#
+# Both produce the same list of dicts for the same fields. zeep's exceptions
+# are imported where they are raised: importing zeep costs a few hundred ms
+# that web workers reading shared-memory snapshots never need to pay.
+
+# Output key -> TMDD element name
+LIVE_FIELDS = {
+    "stationId": "station-id",
+    "detectorId": "detector-id",
+    "vehicleOccupancy": "vehicle-occupancy",
+    "vehicleSpeed": "vehicle-speed",
+    "vehicleCount": "vehicle-count",
+}
+
+ARCHIVE_ELEMENTS = {
+    "stationId": "station-id",
+    "detectorId": "detector-id",
+    "vehicleOccupancy": "vehicle-occupancy",
+    "vehicleSpeed": "vehicle-speed",
+    "vehicleCountBin1": "vehicle-count-bin1",
+    "vehicleCountBin2": "vehicle-count-bin2",
+    "vehicleCountBin3": "vehicle-count-bin3",
+    "vehicleCountBin4": "vehicle-count-bin4",
+    "vehicleCount": "vehicle-count",
+}
+
+# Identifier elements stay strings; everything else is a TMDD integer
+ID_FIELDS = ("stationId", "detectorId")
+
+
+class DetectorColumns:
+    """Preallocated column block for one poll, grown by doubling.
+
+    Identifier columns live in an object array of strings, value columns in
+    a float64 array with NaN where the element was missing; both are
+    shaped (rows, columns).
+    """
+
+    def __init__(self, fields, capacity=1024):
+        self.fields = dict(fields)
+        self.id_keys = [key for key in self.fields if key in ID_FIELDS]
+        self.value_keys = [key for key in self.fields if key not in ID_FIELDS]
+        self.size = 0
+        self.ids = np.full((capacity, len(self.id_keys)), None, dtype=object)
+        self.values = np.full((capacity, len(self.value_keys)), np.nan)
+
+    @classmethod
+    def from_records(cls, records, fields=LIVE_FIELDS):
+        columns = cls(fields, max(1, len(records)))
+        columns.size = len(records)
+        columns.ids[:columns.size] = [[r.get(key) for key in columns.id_keys] for r in records]
+        columns.values[:columns.size] = np.array(
+            [[r.get(key) for key in columns.value_keys] for r in records], dtype=np.float64
+        ).reshape(-1, len(columns.value_keys))
+        return columns
+
+    def add_row(self, id_row, value_row):
+        if self.size == len(self.values):
+            self.ids = np.concatenate([self.ids, np.full(self.ids.shape, None, dtype=object)])
+            self.values = np.concatenate([self.values, np.full(self.values.shape, np.nan)])
+        self.ids[self.size] = id_row
+        self.values[self.size] = value_row
+        self.size += 1
+
+    def column(self, key):
+        """Trimmed view of one column."""
+        if key in ID_FIELDS:
+            return self.ids[:self.size, self.id_keys.index(key)]
+        return self.values[:self.size, self.value_keys.index(key)]
+
+    def records(self, keys=None):
+        keys = [key for key in (keys or self.fields) if key in self.fields]
+        columns = [
+            self.column(key).tolist() if key in ID_FIELDS else [json_number(v) for v in self.column(key).tolist()]
+            for key in keys
+        ]
+        return [dict(zip(keys, row)) for row in zip(*columns)]
+
+
+def parse_detector_xml(source, fields=LIVE_FIELDS, capacity=1024):
+    """Stream-parse a raw TMDD detector reply into DetectorColumns.
+
+    `source` is bytes or a file-like object. Raises zeep's Fault when the
+    envelope carries a SOAP fault.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    columns = DetectorColumns(fields, capacity)
+    slots = {columns.fields[key]: (True, j) for j, key in enumerate(columns.id_keys)}
+    slots.update({columns.fields[key]: (False, j) for j, key in enumerate(columns.value_keys)})
+    tag_slots = {}  # namespaced tag -> slot (or None), resolved once per tag
+    nan = float("nan")
+
+    for event, elem in etree.iterparse(source, events=("end",), tag=("{*}detector-data-detail", "{*}Fault"), huge_tree=True):
+        if etree.QName(elem).localname == "Fault":
+            from zeep.exceptions import Fault
+            faultstring = elem.findtext("{*}faultstring") or elem.findtext(".//{*}Text") or "Unknown fault"
+            raise Fault(faultstring)
+
+        id_row = [None] * len(columns.id_keys)
+        value_row = [nan] * len(columns.value_keys)
+        for child in elem:
+            tag = child.tag
+            if tag not in tag_slots:
+                tag_slots[tag] = slots.get(etree.QName(tag).localname) if isinstance(tag, str) else None
+            slot = tag_slots[tag]
+            if slot is None or child.text is None:
+                continue
+            is_id, j = slot
+            if is_id:
+                id_row[j] = child.text
+            else:
+                value_row[j] = float(child.text)
+        columns.add_row(id_row, value_row)
+
+        # Keep memory flat: drop the element and everything before it
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+    return columns
+
+
+def records_from_zeep(response, fields=LIVE_FIELDS):
+    """Walk zeep's object graph the way the collectors always have."""
+    data = []
+    for item in response or []:
+        detector_list = getattr(item, 'detector-list', None)
+        if not detector_list:
+            continue
+
+        detector_details = getattr(detector_list, 'detector-data-detail', [])
+        for detector in detector_details:
+            data.append({key: getattr(detector, element, None) for key, element in fields.items()})
+    return data
+
+
+def request_detector_reply(client, soap_parameters, parser="zeep"):
+    """Call dlDetectorDataRequest without parsing the detectors yet.
+
+    Returns the raw reply bytes for "stream" and zeep's result for "zeep",
+    so parsing can be done later, off the polling thread.
+    """
+    if parser == "stream":
+        with client.settings(raw_response=True):
+            response = client.service.dlDetectorDataRequest(**soap_parameters)
+        if response.status_code >= 400:
+            from zeep.exceptions import TransportError
+            parse_detector_xml(response.content, {})  # raises Fault if there is one
+            raise TransportError(status_code=response.status_code, content=response.content)
+        return response.content
+
+    return client.service.dlDetectorDataRequest(**soap_parameters)
+
+
+def parse_detector_reply(reply, fields=LIVE_FIELDS, parser="zeep"):
+    """Turn a request_detector_reply() result into DetectorColumns."""
+    if parser == "stream":
+        return parse_detector_xml(reply, fields)
+    return DetectorColumns.from_records(records_from_zeep(reply, fields), fields)
+
+
+def fetch_detector_columns(client, soap_parameters, fields=LIVE_FIELDS, parser="zeep"):
+    """Call dlDetectorDataRequest and return DetectorColumns."""
+    return parse_detector_reply(request_detector_reply(client, soap_parameters, parser), fields, parser)
+
+
+def fetch_detector_records(client, soap_parameters, fields=LIVE_FIELDS, parser="zeep"):
+    """Call dlDetectorDataRequest and return a list of detector dicts."""
+    if parser == "stream":
+        return fetch_detector_columns(client, soap_parameters, fields, parser).records()
+
+    response = client.service.dlDetectorDataRequest(**soap_parameters)
+    return records_from_zeep(response, fields)
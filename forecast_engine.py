@@ -0,0 +1,175 @@
+import math
+import threading
+
+import numpy as np
+
+from history_store import FORECAST_INPUT_MINUTES, HISTORY_FIELDS
+from json_values import json_rounded
+
+# ----------------------------
+# 📍 Batched Forecasting
+# ----------------------------
+# On every poll the last `input_steps` slots of the HistoryStore ring are
+# gathered into one [detectors, steps, fields] block and handed to the
+# model in a single call; no per-detector loop anywhere. The ring is
+# already updated incrementally by the poll itself, so building the
+# feature window is one fancy-index copy.
+#
+# Models map float [D, input_steps, 3] -> float [D, horizon_steps, 3] in
+# HISTORY_FIELDS order (speed, count, occupancy):
+#
+#   BaselineModel       NaN-aware EWMA level plus damped trend (numpy)
+#   TorchScriptModel    any scripted module with that signature (torch is
+#                       imported only when one is configured)
+#
+# The result for a poll is cached by its timestamp and sampled at the
+# configured horizons for the `forecast` event and /forecast.
+
+DEFAULT_HORIZONS_MINUTES = (5, 15, 30)
+
+
+class BaselineModel:
+    """Exponentially weighted level plus a damped linear trend, per detector and field."""
+
+    def __init__(self, input_steps, horizon_steps, alpha=0.3, damping=0.8):
+        self.input_steps = input_steps
+        self.horizon_steps = horizon_steps
+        self.alpha = alpha
+        self.damping = damping
+
+    def predict(self, window):
+        steps = window.shape[1]
+        valid = ~np.isnan(window)
+        values = np.where(valid, window, 0.0)
+
+        # Level: EWMA over the valid samples only
+        weights = (1 - self.alpha) ** np.arange(steps - 1, -1, -1, dtype=np.float64)[None, :, None] * valid
+        total = weights.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            level = (weights * values).sum(axis=1) / total
+
+            # Trend: least-squares slope through the valid samples
+            t = np.arange(steps, dtype=np.float64)[None, :, None]
+            samples = valid.sum(axis=1)
+            t_mean = (t * valid).sum(axis=1) / samples
+            x_mean = values.sum(axis=1) / samples
+            dt = (t - t_mean[:, None, :]) * valid
+            slope = (dt * (values - x_mean[:, None, :])).sum(axis=1) / (dt ** 2).sum(axis=1)
+        slope = np.where(samples > 1, np.nan_to_num(slope), 0.0)
+
+        damped = np.cumsum(self.damping ** np.arange(1, self.horizon_steps + 1))
+        forecast = level[:, None, :] + slope[:, None, :] * damped[None, :, None]
+        np.maximum(forecast, 0.0, out=forecast)
+        occupancy = HISTORY_FIELDS.index("vehicleOccupancy")
+        np.minimum(forecast[:, :, occupancy], 100.0, out=forecast[:, :, occupancy])
+        return forecast
+
+
+class TorchScriptModel:
+    """A TorchScript module run on CPU in one batched call.
+
+    Gaps in the window are forward-filled per detector (then zero-filled)
+    before the call, since most trained models can't take NaN.
+    """
+
+    def __init__(self, path, input_steps, horizon_steps, threads=None):
+        import torch
+
+        self.torch = torch
+        if threads:
+            torch.set_num_threads(threads)
+        self.module = torch.jit.load(path, map_location="cpu").eval()
+        self.input_steps = input_steps
+        self.horizon_steps = horizon_steps
+
+    def predict(self, window):
+        filled = _forward_fill(window).astype(np.float32)
+        with self.torch.inference_mode():
+            output = self.module(self.torch.from_numpy(filled))
+        output = output.numpy().astype(np.float64)
+        if output.shape[1] < self.horizon_steps:
+            raise ValueError(f"model returned {output.shape[1]} steps, {self.horizon_steps} needed")
+        return output[:, :self.horizon_steps]
+
+
+def _forward_fill(window):
+    """Carry the last valid value forward along the time axis; leading gaps become 0."""
+    valid = ~np.isnan(window)
+    positions = np.where(valid, np.arange(window.shape[1])[None, :, None], 0)
+    np.maximum.accumulate(positions, axis=1, out=positions)
+    filled = np.take_along_axis(window, positions, axis=1)
+    return np.nan_to_num(filled, nan=0.0)
+
+
+def load_model(config, time_step_minutes):
+    """Model named by `forecast_model`: "baseline" or a TorchScript file."""
+    input_steps = max(2, math.ceil(config.get("forecast_input_minutes", FORECAST_INPUT_MINUTES) / time_step_minutes))
+    horizons = config.get("forecast_horizons_minutes", DEFAULT_HORIZONS_MINUTES)
+    horizon_steps = max(1, max(math.ceil(h / time_step_minutes) for h in horizons))
+
+    name = config.get("forecast_model", "baseline")
+    if name == "baseline":
+        return BaselineModel(input_steps, horizon_steps)
+    return TorchScriptModel(name, input_steps, horizon_steps, config.get("forecast_threads"))
+
+
+class Forecaster:
+    """Run the model over the HistoryStore once per poll and cache the result."""
+
+    def __init__(self, history_store, model, time_step_minutes, horizons_minutes=DEFAULT_HORIZONS_MINUTES):
+        if history_store.capacity < model.input_steps:
+            raise ValueError(
+                f"history holds {history_store.capacity} steps but the model reads {model.input_steps}; "
+                "size the HistoryStore with HistoryStore.from_config() or a larger capacity"
+            )
+        self.history_store = history_store
+        self.model = model
+        self.horizons = [h for h in horizons_minutes if math.ceil(h / time_step_minutes) <= model.horizon_steps]
+        self._horizon_slots = [math.ceil(h / time_step_minutes) - 1 for h in self.horizons]
+        self._cached = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, history_store):
+        time_step = config.get("time_step_minutes", 0.5)
+        model = load_model(config, time_step)
+        return cls(history_store, model, time_step, config.get("forecast_horizons_minutes", DEFAULT_HORIZONS_MINUTES))
+
+    @property
+    def latest(self):
+        return self._cached
+
+    def update(self, timestamp):
+        """Forecast from the polls up to `timestamp`; cached per timestamp."""
+        with self._lock:
+            if self._cached is not None and self._cached["timestamp"] == timestamp:
+                return self._cached
+
+            detector_ids, station_ids, _, window = self.history_store.window(self.model.input_steps)
+            if len(detector_ids):
+                predicted = self.model.predict(window)[:, self._horizon_slots]
+            else:
+                predicted = np.empty((0, len(self.horizons), len(HISTORY_FIELDS)))
+
+            forecast = {
+                "timestamp": timestamp,
+                "horizons": list(self.horizons),
+                "detectorId": detector_ids,
+                "stationId": station_ids,
+            }
+            for j, field in enumerate(HISTORY_FIELDS):
+                forecast[field] = json_rounded(predicted[:, :, j])
+            self._cached = forecast
+            return forecast
+
+
+def select_forecast(forecast, station_ids=None, detector_ids=None):
+    """Rows of a forecast restricted to some stations and/or detectors."""
+    keep = [
+        i for i, (detector_id, station_id) in enumerate(zip(forecast["detectorId"], forecast["stationId"]))
+        if (station_ids is None or station_id in station_ids) and (detector_ids is None or detector_id in detector_ids)
+    ]
+    return {
+        key: value if key in ("timestamp", "horizons") else [value[i] for i in keep]
+        for key, value in forecast.items()
+    }
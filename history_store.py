@@ -0,0 +1,145 @@
+import math
+import threading
+
+import numpy as np
+
+from json_values import json_number
+
+# ----------------------------
+# 📍 Ring-Buffer History Store
+# ----------------------------
+# One preallocated float64 block of shape (detectors, capacity, fields).
+# Every poll writes a single time slot for all detectors, so the ring head
+# and the timestamp labels are shared by every detector.
+
+HISTORY_FIELDS = ("vehicleSpeed", "vehicleCount", "vehicleOccupancy")
+
+# Default `forecast_input_minutes`; forecast_engine reads the same value
+FORECAST_INPUT_MINUTES = 15
+
+
+class HistoryStore:
+    """Fixed-size per-detector history of speed, count and occupancy."""
+
+    def __init__(self, capacity, time_step_minutes, initial_detectors=1024):
+        self.capacity = max(1, int(capacity))
+        self.time_step_minutes = time_step_minutes
+
+        self._values = np.full((initial_detectors, self.capacity, len(HISTORY_FIELDS)), np.nan, dtype=np.float64)
+        self._labels = [None] * self.capacity
+        self._head = 0      # next slot to write
+        self._size = 0      # number of filled slots
+        self._rows = {}     # detectorId -> row in self._values
+        self._row_ids = []  # row -> (detectorId, stationId)
+        self._stations = {} # stationId -> [detectorId, ...]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, initial_detectors=1024):
+        """Size the buffer to cover `sensor_info_minutes_back` and the forecast input."""
+        time_step = config.get("time_step_minutes", 0.5)
+        minutes_back = max(
+            config.get("sensor_info_minutes_back", 15),
+            config.get("forecast_input_minutes", FORECAST_INPUT_MINUTES)
+        )
+        # Forecast windows are at least two steps long (see forecast_engine.load_model)
+        return cls(max(2, math.ceil(minutes_back / time_step)), time_step, initial_detectors)
+
+    @property
+    def nbytes(self):
+        return self._values.nbytes
+
+    def _row_for(self, detector_id, station_id):
+        row = self._rows.get(detector_id)
+        if row is not None:
+            return row
+
+        row = len(self._rows)
+        if row >= self._values.shape[0]:
+            grown = np.full((self._values.shape[0] * 2,) + self._values.shape[1:], np.nan, dtype=np.float64)
+            grown[:self._values.shape[0]] = self._values
+            self._values = grown
+        self._rows[detector_id] = row
+        self._row_ids.append((detector_id, station_id))
+        self._stations.setdefault(station_id, []).append(detector_id)
+        return row
+
+    def append(self, timestamp, records):
+        """Write one poll (a list of detector dicts) into the next slot."""
+        with self._lock:
+            rows = np.fromiter(
+                (self._row_for(r["detectorId"], r["stationId"]) for r in records if r.get("detectorId") is not None),
+                dtype=np.intp
+            )
+            values = np.array(
+                [[r.get(field) for field in HISTORY_FIELDS] for r in records if r.get("detectorId") is not None],
+                dtype=np.float64
+            ).reshape(-1, len(HISTORY_FIELDS))
+
+            slot = self._head
+            self._values[:, slot, :] = np.nan
+            self._values[rows, slot, :] = values
+            self._labels[slot] = timestamp
+
+            self._head = (slot + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def _slots(self, minutes):
+        count = self._size
+        if minutes is not None:
+            count = min(count, max(1, math.ceil(minutes / self.time_step_minutes)))
+        return (self._head - count + np.arange(count)) % self.capacity
+
+    def window(self, steps):
+        """Last `steps` polls for every detector, oldest first.
+
+        Returns (detector ids, station ids, labels, float64 [detectors, steps,
+        fields]); slots older than the first poll are NaN with a None label.
+        """
+        steps = min(int(steps), self.capacity)
+        with self._lock:
+            slots = (self._head - steps + np.arange(steps)) % self.capacity
+            detectors = len(self._row_ids)
+            values = self._values[:detectors, slots]
+            labels = [self._labels[s] for s in slots]
+            row_ids = list(self._row_ids)
+        return [d for d, _ in row_ids], [s for _, s in row_ids], labels, values
+
+    def detector_history(self, detector_id, minutes=None):
+        """Return the last `minutes` of samples for one detector, oldest first."""
+        with self._lock:
+            row = self._rows.get(detector_id)
+            if row is None:
+                return None
+            slots = self._slots(minutes)
+            window = self._values[row, slots]
+            labels = [self._labels[s] for s in slots]
+        return _samples(labels, window)
+
+    def station_history(self, station_id, minutes=None):
+        """Return {detectorId: history} for every lane seen at a station.
+
+        All lanes are read under one lock, so they come from the same polls.
+        """
+        with self._lock:
+            detector_ids = self._stations.get(station_id)
+            if detector_ids is None:
+                return None
+            detector_ids = list(detector_ids)
+            slots = self._slots(minutes)
+            windows = self._values[[self._rows[d] for d in detector_ids]][:, slots]
+            labels = [self._labels[s] for s in slots]
+        return {detector_id: _samples(labels, window) for detector_id, window in zip(detector_ids, windows)}
+
+
+def _samples(labels, window):
+    """[slots, fields] of one detector -> JSON-ready samples."""
+    return [
+        {
+            "timestamp": label,
+            "speed": json_number(speed),
+            "vehicles": json_number(count),
+            "occupancy": json_number(occupancy)
+        }
+        for label, (speed, count, occupancy) in zip(labels, window.tolist())
+    ]
@@ -1,11 +1,16 @@
 import json
 import os
-import time
 from datetime import datetime
-from zeep import Client, Settings
-from zeep.exceptions import Fault
 import pytz
 
+from archive_store import ArchiveWriter
+from detector_parser import ARCHIVE_ELEMENTS, parse_detector_reply, request_detector_reply
+from poll_scheduler import PollScheduler
+from rollup_store import RollupWriter
+from snapshot_bus import SnapshotPublisher
+from soap_settings import soap_parameters
+from wsdl_cache import CachedClient
+
 # ----------------------------
 # 📍 1. Configuration
 # ----------------------------
@@ -21,57 +26,61 @@ desktop_path = os.path.join(os.path.expanduser('~'), 'Desktop')
 base_data_dir = os.path.join(desktop_path, 'json_data')
 save_directory = base_data_dir
 log_directory = os.path.join(base_data_dir, 'logs')
+archive_directory = os.path.join(base_data_dir, 'archive')
+rollup_directory = os.path.join(base_data_dir, 'rollups')
+
+# "segment" appends every poll to daily columnar segments (see archive_store.py);
+# "json" keeps the legacy one-file-per-poll output in save_directory
+ARCHIVE_FORMAT = "segment"
 
 # Time step in minutes
 TIME_STEP_MINUTES = 0.5
 
-# Authentication parameters
-auth_params = {
-    "user-id": "UNLV_TRC_RTIS",
-    "password": "+r@^~Tr&lt;R?|$"
-}
-organization_info = {
-    "organization-id": "unlv.edu",
-    "center-contact-list": {
-        "center-contact-details": {"center-id": "UNLV_TRC"}
-    }
-}
-requesting_organization_info = {
-    "organization-id": "its.nv.gov",
-    "center-contact-list": {
-        "center-contact-details": {"center-id": "FAST"}
-    }
-}
-device_type = "detector"
-device_info = "device data"
-
-# SOAP request parameters
-soap_parameters = {
-    "device-information-request-header": {
-        "authentication": auth_params,
-        "organization-information": organization_info,
-        "organization-requesting": requesting_organization_info,
-        "device-type": device_type,
-        "device-information-type": device_info
-    }
-}
+# Timeout for loading the WSDL and for each SOAP call, in seconds
+FETCH_TIMEOUT_SECONDS = 20
+
+# The WSDL is cached here and re-checked in the background (see wsdl_cache.py),
+# so restarts don't wait on downloading it
+WSDL_CACHE_DIR = os.path.join(base_data_dir, 'wsdl_cache')
+WSDL_REFRESH_HOURS = 24
+
+# "zeep" walks zeep's object graph; "stream" parses the raw reply (see detector_parser.py)
+SOAP_PARSER = "stream"
+
+# Also publish every poll to shared memory for `app.py --mode web` workers,
+# so the dashboard needs no SOAP poll of its own
+PUBLISH_SNAPSHOTS = False
+SNAPSHOT_PATH = None  # None -> /dev/shm/traffic_snapshot.bin
 
 # ----------------------------
 # 📍 2. Initialize
 # ----------------------------
 
-# Ensure folders exist
-os.makedirs(save_directory, exist_ok=True)
-os.makedirs(log_directory, exist_ok=True)
+# Created by init_collector() so importing this module has no side effects
+archive_writer = None
+rollup_writer = None
+snapshot_publisher = None
+soap_client = CachedClient(wsdl_url, WSDL_CACHE_DIR, timeout=FETCH_TIMEOUT_SECONDS,
+                           refresh_hours=WSDL_REFRESH_HOURS)
+
+def init_collector():
+    """Create folders, the archive and rollup writers and (optionally) the snapshot publisher."""
+    global archive_writer, rollup_writer, snapshot_publisher
+    if archive_writer is not None:
+        return
+
+    # Ensure folders exist
+    os.makedirs(save_directory, exist_ok=True)
+    os.makedirs(log_directory, exist_ok=True)
 
-# Configure Zeep client
-settings = Settings(strict=False, xml_huge_tree=True)
+    archive_writer = ArchiveWriter(archive_directory, segment="daily", compression="zlib")
+    # 1-minute / 15-minute / hourly aggregates behind app.py's /range
+    rollup_writer = RollupWriter(rollup_directory)
+    snapshot_publisher = SnapshotPublisher(SNAPSHOT_PATH) if PUBLISH_SNAPSHOTS else None
 
-try:
-    client = Client(wsdl=wsdl_url, settings=settings)
-except Exception as e:
-    print(f"Failed to connect to SOAP service: {e}")
-    exit()
+def request_reply():
+    """One dlDetectorDataRequest; the client is built from the cached WSDL on first use."""
+    return request_detector_reply(soap_client.get(), soap_parameters, parser=SOAP_PARSER)
 
 # ----------------------------
 # 📍 3. Helper Functions
@@ -95,51 +104,36 @@ def write_log(event_type, message, extra_info=None):
     with open(log_filepath, 'a') as log_file:
         log_file.write(json.dumps(log_entry) + "\n")  # Save log entries as JSON per line
 
-def fetch_and_save_data():
-    """Fetch sensor data and save to JSON."""
-    fetch_start = datetime.now(local_timezone)
-    
-    try:
-        response = client.service.dlDetectorDataRequest(**soap_parameters)
-    except Fault as e:
-        error_msg = f"SOAP request failed: {e}"
-        print(error_msg)
-        write_log("ERROR", error_msg)
-        return
+def log_fetch_error(error, attempt=1):
+    error_msg = f"SOAP request failed (attempt {attempt}): {error}"
+    print(error_msg)
+    write_log("ERROR", error_msg)
+
+def save_data(fetch_start, reply, fetch_seconds=None):
+    """Parse a raw detector reply and archive it."""
+    init_collector()
+    columns = parse_detector_reply(reply, ARCHIVE_ELEMENTS, parser=SOAP_PARSER)
 
-    if not response:
+    if not columns.size:
         msg = "No data returned from SOAP service."
         print(msg)
         write_log("ERROR", msg)
         return
 
-    sensor_data = []
-    for item in response:
-        detector_list = getattr(item, 'detector-list', None)
-        if not detector_list:
-            continue
-        
-        detector_details = getattr(detector_list, 'detector-data-detail', [])
-        for detector in detector_details:
-            sensor_data.append({
-                'stationId': getattr(detector, 'station-id', None),
-                'detectorId': getattr(detector, 'detector-id', None),
-                'vehicleOccupancy': getattr(detector, 'vehicle-occupancy', None),
-                'vehicleSpeed': getattr(detector, 'vehicle-speed', None),
-                'vehicleCountBin1': getattr(detector, 'vehicle-count-bin1', None),
-                'vehicleCountBin2': getattr(detector, 'vehicle-count-bin2', None),
-                'vehicleCountBin3': getattr(detector, 'vehicle-count-bin3', None),
-                'vehicleCountBin4': getattr(detector, 'vehicle-count-bin4', None),
-                'vehicleCount': getattr(detector, 'vehicle-count', None),
-            })
+    if snapshot_publisher is not None:
+        snapshot_publisher.publish(fetch_start.strftime('%Y-%m-%d %H:%M:%S'), columns)
 
     timestamp_str = fetch_start.strftime('%Y-%m-%d_%H-%M-%S')
-    filename = f"{timestamp_str}.json"
-    filepath = os.path.join(save_directory, filename)
 
     try:
-        with open(filepath, 'w') as f:
-            json.dump(sensor_data, f, indent=4)
+        if ARCHIVE_FORMAT == "segment":
+            # Value columns come out of the parser in ARCHIVE_FIELDS order
+            ids = list(zip(columns.column("detectorId").tolist(), columns.column("stationId").tolist()))
+            filename = archive_writer.append_columns(fetch_start, ids, columns.values[:columns.size]) + ".seg"
+        else:
+            filename = f"{timestamp_str}.json"
+            with open(os.path.join(save_directory, filename), 'w') as f:
+                json.dump(columns.records(), f, indent=4)
         
         fetch_end = datetime.now(local_timezone)
         duration_seconds = (fetch_end - fetch_start).total_seconds()
@@ -148,24 +142,53 @@ def fetch_and_save_data():
         print(success_msg)
         write_log("SUCCESS", success_msg, {
             "file": filename,
-            "entries_saved": len(sensor_data),
-            "fetch_duration_sec": duration_seconds
+            "entries_saved": columns.size,
+            "fetch_duration_sec": duration_seconds,
+            "request_duration_sec": fetch_seconds
         })
 
     except Exception as e:
-        error_msg = f"Failed to save JSON file: {e}"
+        error_msg = f"Failed to save data: {e}"
+        print(error_msg)
+        write_log("ERROR", error_msg)
+
+    try:
+        rollup_writer.append(fetch_start, columns)
+    except Exception as e:
+        error_msg = f"Failed to update rollups: {e}"
         print(error_msg)
         write_log("ERROR", error_msg)
 
+def fetch_and_save_data():
+    """Fetch sensor data once and archive it."""
+    init_collector()
+    fetch_start = datetime.now(local_timezone)
+
+    try:
+        reply = request_reply()
+    except Exception as e:
+        log_fetch_error(e)
+        return
+
+    save_data(fetch_start, reply)
+
 # ----------------------------
 # 📍 4. Main Loop
 # ----------------------------
 
 if __name__ == "__main__":
+    init_collector()
+    soap_client.start_background_refresh()
     print(f"Starting live data collection every {TIME_STEP_MINUTES} minutes...\n")
     write_log("INFO", f"Service started. Fetch interval: {TIME_STEP_MINUTES} minutes.")
     
-    while True:
-        fetch_and_save_data()
-        print(f"Waiting {TIME_STEP_MINUTES} minutes for next fetch...\n")
-        time.sleep(TIME_STEP_MINUTES * 60)
+    # Fetches fire on wall-clock-aligned ticks; parsing and archiving run
+    # in the background while the scheduler waits for the next one
+    scheduler = PollScheduler(
+        TIME_STEP_MINUTES * 60,
+        fetch=request_reply,
+        handle=save_data,
+        on_error=log_fetch_error,
+        name="archive"
+    )
+    scheduler.run()
@@ -0,0 +1,20 @@
+import numpy as np
+
+# ----------------------------
+# 📍 JSON Values
+# ----------------------------
+# Detector values are float64 with NaN for "missing"; JSON payloads carry
+# None instead. Shared by the parser, the stores and every emitted summary.
+
+
+def json_number(value):
+    """One float as JSON: None for NaN, int when it is a whole number."""
+    if value != value:  # NaN
+        return None
+    return int(value) if value.is_integer() else value
+
+
+def json_rounded(values, decimals=1):
+    """Array (any shape) as nested lists rounded to `decimals`, None for NaN."""
+    rounded = np.round(values, decimals)
+    return np.where(np.isnan(rounded), None, rounded).tolist()
@@ -0,0 +1,246 @@
+import hashlib
+import math
+import threading
+
+import numpy as np
+from flask import request
+from flask_socketio import join_room, leave_room
+
+from forecast_engine import select_forecast
+from station_aggregates import select_stations
+
+try:
+    import msgpack
+except ImportError:  # binary frames are optional
+    msgpack = None
+
+# ----------------------------
+# 📍 Delta / Viewport Push
+# ----------------------------
+# Clients that never subscribe keep receiving the full `new_data` snapshot.
+# Clients that emit `subscribe` are grouped into one Socket.IO room per
+# distinct subscription (station set + encoding), so each poll builds one
+# delta frame per room instead of one per client.
+#
+# Frames carry a sequence number. A room gets a frame on every poll, even
+# an empty one, so a client that sees `seq` jump by more than one knows it
+# missed a frame and asks for a `resync`. `new_data` and `delta` frames
+# also carry `tick`, the epoch of the scheduler tick the poll was fetched
+# on (None for polls taken from a collector's shared memory).
+
+LEGACY_ROOM = "legacy"
+VALUE_FIELDS = ("vehicleSpeed", "vehicleCount", "vehicleOccupancy")
+
+
+class LivePush:
+    """Fan out live detector data as full snapshots or per-room deltas."""
+
+    def __init__(self, socketio, sensor_metadata):
+        self.socketio = socketio
+        self.sensor_metadata = sensor_metadata
+
+        self.seq = 0
+        self._timestamp = None
+        self._tick = None
+        self._snapshot = {}       # detectorId -> latest record
+        self._station_summary = None
+        self._rooms = {}          # room -> {"stations": frozenset | None, "binary": bool, "members": set}
+        self._client_rooms = {}   # sid -> room
+        self._legacy = set()      # sids still on full snapshots
+        self._lock = threading.Lock()
+
+    # ----------------------------
+    # 📍 Subscriptions
+    # ----------------------------
+    def register_handlers(self):
+        self.socketio.on_event("connect", self._on_connect)
+        self.socketio.on_event("disconnect", self._on_disconnect)
+        self.socketio.on_event("subscribe", self._on_subscribe)
+        self.socketio.on_event("resync", self._on_resync)
+
+    def _on_connect(self, auth=None):
+        join_room(LEGACY_ROOM)
+        with self._lock:
+            self._client_rooms[request.sid] = LEGACY_ROOM
+            self._legacy.add(request.sid)
+            snapshot = self._full_snapshot()
+        if snapshot["timestamp"] is not None:
+            self.socketio.emit("new_data", snapshot, to=request.sid)
+
+    def _on_disconnect(self, *args):
+        with self._lock:
+            self._leave(request.sid)
+
+    def _on_subscribe(self, options=None):
+        """Switch a client to delta frames for a bbox and/or station list.
+
+        `options` may hold `bbox` as [west, south, east, north], `stations`
+        as a list of station ids and `binary` to request msgpack frames.
+        With neither `bbox` nor `stations` the client gets deltas for all
+        detectors. A malformed `bbox` gets a `subscribe_error` and leaves the
+        subscription unchanged.
+        """
+        options = options or {}
+        bbox = None
+        if options.get("bbox"):
+            bbox = _parse_bbox(options["bbox"])
+            if bbox is None:
+                self.socketio.emit("subscribe_error", {"error": "bbox must be [west, south, east, north]"}, to=request.sid)
+                return
+
+        stations = None
+        if bbox or options.get("stations"):
+            stations = set(options.get("stations") or [])
+            if bbox:
+                stations.update(self.sensor_metadata.ids_in_bbox(*bbox))
+            stations = frozenset(stations)
+        binary = bool(options.get("binary")) and msgpack is not None
+
+        room = "delta:{}:{}".format(
+            "bin" if binary else "json",
+            "all" if stations is None else hashlib.sha1("\n".join(sorted(stations)).encode()).hexdigest()
+        )
+
+        sid = request.sid
+        with self._lock:
+            old_room = self._leave(sid)
+            if old_room is not None:
+                leave_room(old_room)
+            join_room(room)
+            entry = self._rooms.setdefault(room, {"stations": stations, "binary": binary, "members": set()})
+            entry["members"].add(sid)
+            self._client_rooms[sid] = room
+            frame = self._resync_frame(entry)
+            summary = self._station_summary
+
+        if summary is not None:
+            self.socketio.emit("station_summary", summary if stations is None else select_stations(summary, stations), to=sid)
+        self.socketio.emit("subscribed", {"binary": binary, "stations": None if stations is None else len(stations)}, to=sid)
+        self.socketio.emit("resync", frame, to=sid)
+
+    def _on_resync(self, *args):
+        with self._lock:
+            entry = self._rooms.get(self._client_rooms.get(request.sid))
+            if entry is None:
+                frame = self._full_snapshot()
+                event = "new_data"
+            else:
+                frame = self._resync_frame(entry)
+                event = "resync"
+        self.socketio.emit(event, frame, to=request.sid)
+
+    def _leave(self, sid):
+        self._legacy.discard(sid)
+        room = self._client_rooms.pop(sid, None)
+        entry = self._rooms.get(room)
+        if entry is not None:
+            entry["members"].discard(sid)
+            if not entry["members"]:
+                del self._rooms[room]
+        return room
+
+    # ----------------------------
+    # 📍 Publishing
+    # ----------------------------
+    def publish(self, timestamp, records, tick=None):
+        """Diff a new poll against the previous one and emit to every room."""
+        with self._lock:
+            previous = self._snapshot
+            current = {r["detectorId"]: r for r in records}
+            changed = [
+                r for detector_id, r in current.items()
+                if _values(previous.get(detector_id)) != _values(r)
+            ]
+            removed = [detector_id for detector_id in previous if detector_id not in current]
+
+            self.seq += 1
+            self._timestamp = timestamp
+            self._tick = tick
+            self._snapshot = current
+            rooms = [(room, entry["stations"], entry["binary"]) for room, entry in self._rooms.items()]
+            has_legacy = bool(self._legacy)
+            seq = self.seq
+
+        if has_legacy:
+            self.socketio.emit("new_data", {"timestamp": timestamp, "tick": tick, "data": records}, to=LEGACY_ROOM)
+
+        for room, stations, binary in rooms:
+            if stations is None:
+                room_changed, room_removed = changed, removed
+            else:
+                room_changed = [r for r in changed if r["stationId"] in stations]
+                room_removed = [d for d in removed if previous[d]["stationId"] in stations]
+            frame = {"seq": seq, "timestamp": timestamp, "tick": tick, "data": room_changed, "removed": room_removed}
+            self.socketio.emit("delta", _encode(frame) if binary else frame, to=room)
+
+        return len(changed)
+
+    def publish_stations(self, summary):
+        """Emit a station summary, restricted to each room's stations.
+
+        Only subscribed rooms get it; legacy clients handle `new_data` alone.
+        """
+        with self._lock:
+            self._station_summary = summary
+            rooms = [(room, entry["stations"]) for room, entry in self._rooms.items()]
+
+        for room, stations in rooms:
+            self.socketio.emit("station_summary", summary if stations is None else select_stations(summary, stations), to=room)
+
+    def publish_forecast(self, forecast):
+        """Emit per-detector forecasts, restricted to each room's stations.
+
+        Like station summaries, only subscribed rooms get them.
+        """
+        with self._lock:
+            rooms = [(room, entry["stations"]) for room, entry in self._rooms.items()]
+
+        for room, stations in rooms:
+            self.socketio.emit("forecast", forecast if stations is None else select_forecast(forecast, stations), to=room)
+
+    def _full_snapshot(self):
+        return {"timestamp": self._timestamp, "tick": self._tick, "data": list(self._snapshot.values())}
+
+    def _resync_frame(self, entry):
+        stations = entry["stations"]
+        data = [
+            r for r in self._snapshot.values()
+            if stations is None or r["stationId"] in stations
+        ]
+        frame = {"seq": self.seq, "timestamp": self._timestamp, "tick": self._tick, "data": data, "removed": []}
+        return _encode(frame) if entry["binary"] else frame
+
+
+def _parse_bbox(bbox):
+    """[west, south, east, north] as four finite floats, else None."""
+    try:
+        values = [float(v) for v in bbox]
+    except (TypeError, ValueError):
+        return None
+    if len(values) != 4 or not all(map(math.isfinite, values)):
+        return None
+    return values
+
+
+def _values(record):
+    if record is None:
+        return None
+    return tuple(record.get(field) for field in VALUE_FIELDS)
+
+
+def _encode(frame):
+    """Pack a frame as msgpack with float32 value columns (NaN for missing)."""
+    data = frame["data"]
+    columns = {
+        field: np.array([r.get(field) for r in data], dtype=np.float32).tobytes()
+        for field in VALUE_FIELDS
+    }
+    return msgpack.packb({
+        "seq": frame["seq"],
+        "timestamp": frame["timestamp"],
+        "tick": frame["tick"],
+        "stationId": [r["stationId"] for r in data],
+        "detectorId": [r["detectorId"] for r in data],
+        "removed": frame["removed"],
+        **columns
+    })
@@ -0,0 +1,107 @@
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytz
+
+# ----------------------------
+# 📍 Poll Scheduler
+# ----------------------------
+# Drives both collectors. Ticks land on wall-clock multiples of the
+# interval (e.g. :00 and :30 for 30 s), so a slow fetch never pushes later
+# ticks back. A failed fetch is retried with jittered exponential backoff
+# until the next tick is due, then that tick is given up. Parsing,
+# archiving and emitting run on a single background worker (so they stay
+# in order) while the scheduler is already waiting for the next tick.
+
+local_timezone = pytz.timezone("America/Los_Angeles")
+
+
+class PollScheduler:
+    """Run `fetch` on aligned ticks and hand results to `handle` off-thread."""
+
+    def __init__(self, interval_seconds, fetch, handle, on_error=None,
+                 backoff_base=2.0, backoff_max=None, name="poll"):
+        self.interval = float(interval_seconds)
+        self.fetch = fetch
+        self.handle = handle
+        self.on_error = on_error
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max or self.interval / 2
+        self.name = name
+
+        self._stop = threading.Event()
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}-handle")
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+    def next_tick(self, now=None):
+        now = time.time() if now is None else now
+        return math.floor(now / self.interval) * self.interval + self.interval
+
+    def tick_of(self, when):
+        """Epoch seconds of the tick a fetch started at `when` (datetime) belongs to."""
+        return math.floor(when.timestamp() / self.interval) * self.interval
+
+    def backoff(self, attempt):
+        """Equal-jitter exponential backoff for the given retry number."""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, fire_immediately=True):
+        """Block and poll until stop() is called."""
+        deadline = time.time() if fire_immediately else self.next_tick()
+        while not self._stop.wait(max(0.0, deadline - time.time())):
+            expected = self.next_tick(deadline)
+            self._run_tick(expected)
+
+            deadline = self.next_tick()
+            if deadline > expected:
+                skipped = round((deadline - expected) / self.interval)
+                print(f"[{self.name}] tick overran; skipped {skipped} tick(s)")
+
+        self._worker.shutdown(wait=True)
+
+    def _run_tick(self, next_deadline):
+        attempt = 0
+        while not self._stop.is_set():
+            fetched_at = datetime.now(local_timezone)
+            started = time.perf_counter()
+            try:
+                result = self.fetch()
+            except Exception as e:
+                delay = self.backoff(attempt)
+                attempt += 1
+                if self.on_error is not None:
+                    self.on_error(e, attempt)
+                else:
+                    print(f"[{self.name}] fetch failed (attempt {attempt}): {e}")
+                if time.time() + delay >= next_deadline:
+                    return
+                self._stop.wait(delay)
+                continue
+
+            self._submit(fetched_at, result, time.perf_counter() - started)
+            return
+
+    def _submit(self, fetched_at, result, fetch_seconds):
+        with self._pending_lock:
+            self._pending += 1
+            if self._pending > 1:
+                print(f"[{self.name}] handling is behind: {self._pending} polls queued")
+        self._worker.submit(self._handle, fetched_at, result, fetch_seconds)
+
+    def _handle(self, fetched_at, result, fetch_seconds):
+        try:
+            self.handle(fetched_at, result, fetch_seconds)
+        except Exception as e:
+            print(f"[{self.name}] handling failed: {e}")
+        finally:
+            with self._pending_lock:
+                self._pending -= 1
@@ -0,0 +1,121 @@
+import glob
+import os
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from archive_store import ARCHIVE_FIELDS, SegmentReader, _load_json_snapshot, local_timezone
+from detector_parser import ARCHIVE_ELEMENTS
+
+# ----------------------------
+# 📍 Archive Replay
+# ----------------------------
+# Plays archived polls back through the live pipeline. Source can be a
+# legacy json_data directory (one YYYY-MM-DD_HH-MM-SS.json per poll) or a
+# segment archive. Each poll is rendered back into a TMDD
+# `dlDetectorDataRequest` reply, so replays exercise the same parser and
+# emit path as live polls; only the SOAP round trip is skipped.
+
+SOAP_ENV = "http://schemas.xmlsoap.org/soap/envelope/"
+TMDD_NS = "http://www.tmdd.org/303/messages"
+
+# Element order of DetectorDataDetail in the TMDD schema
+DETAIL_ORDER = (
+    "detectorId", "stationId", "vehicleCount", "vehicleOccupancy", "vehicleSpeed",
+    "vehicleCountBin1", "vehicleCountBin2", "vehicleCountBin3", "vehicleCountBin4",
+)
+
+
+def render_detector_reply(ids, values):
+    """SOAP envelope bytes for one poll.
+
+    `ids` are (detectorId, stationId) pairs and `values` a [rows,
+    ARCHIVE_FIELDS] array with NaN for missing elements.
+    """
+    columns = {field: values[:, j].tolist() for j, field in enumerate(ARCHIVE_FIELDS)}
+    details = []
+    for i, (detector_id, station_id) in enumerate(ids):
+        row = {"detectorId": detector_id, "stationId": station_id}
+        row.update((field, columns[field][i]) for field in ARCHIVE_FIELDS)
+        parts = []
+        for key in DETAIL_ORDER:
+            value = row[key]
+            if value is None or value != value:
+                continue
+            if isinstance(value, float):
+                value = int(value) if value.is_integer() else value
+            parts.append(f"<{ARCHIVE_ELEMENTS[key]}>{escape(str(value))}</{ARCHIVE_ELEMENTS[key]}>")
+        details.append(f"<detector-data-detail>{''.join(parts)}</detector-data-detail>")
+
+    return (
+        f'<?xml version="1.0" encoding="utf-8"?>'
+        f'<s:Envelope xmlns:s="{SOAP_ENV}"><s:Body>'
+        f'<tmdd:detectorDataMsg xmlns:tmdd="{TMDD_NS}"><detector-data-item>'
+        f'<detector-list>{"".join(details)}</detector-list>'
+        f'</detector-data-item></tmdd:detectorDataMsg>'
+        f'</s:Body></s:Envelope>'
+    ).encode()
+
+
+def iter_archive(directory, start=None, end=None):
+    """Yield (epoch seconds, ids, values) in time order from either archive format."""
+    segments = sorted(path[:-len(".seg")] for path in glob.glob(os.path.join(directory, "*.seg")))
+    if segments:
+        for stem in segments:
+            reader = SegmentReader(stem)
+            try:
+                for timestamp, indices, values in reader.frames(start, end):
+                    yield timestamp, [reader.detector_ids[i] for i in indices.tolist()], np.array(values)
+                indices = values = None
+            finally:
+                reader.close()
+        return
+
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        try:
+            timestamp, ids, values = _load_json_snapshot(path)
+        except ValueError:
+            continue  # not a poll file
+        if (start is None or timestamp >= start) and (end is None or timestamp < end):
+            yield timestamp, ids, values
+
+
+class ReplaySource:
+    """Archived polls as (timestamp label, reply bytes), one per scheduler tick."""
+
+    def __init__(self, directory, speed=60.0, start=None, end=None, loop=False):
+        self.directory = directory
+        self.speed = speed
+        self.start = start
+        self.end = end
+        self.loop = loop
+        self.replayed = 0
+        self._polls = iter_archive(directory, start, end)
+        self._pending = next(self._polls, None)
+        if self._pending is None:
+            raise ValueError(f"No archived polls found in {directory}")
+
+        # Replay at `speed` times the archive's own poll spacing
+        following = next(self._polls, None)
+        step = following[0] - self._pending[0] if following is not None else 30
+        self._lookahead = following
+        self.interval_seconds = max(0.01, step / speed)
+
+    def next_reply(self):
+        """The next poll rendered as a TMDD reply, or None once exhausted."""
+        poll = self._pending
+        if poll is None:
+            return None
+        if self._lookahead is not None:
+            self._pending, self._lookahead = self._lookahead, None
+        else:
+            self._pending = next(self._polls, None)
+        if self._pending is None and self.loop:
+            self._polls = iter_archive(self.directory, self.start, self.end)
+            self._pending = next(self._polls, None)
+
+        timestamp, ids, values = poll
+        self.replayed += 1
+        label = datetime.fromtimestamp(timestamp, local_timezone).strftime('%Y-%m-%d %H:%M:%S')
+        return label, render_detector_reply(ids, values)
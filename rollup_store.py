@@ -0,0 +1,356 @@
+import argparse
+import json
+import math
+import os
+from datetime import datetime
+
+import numpy as np
+import pytz
+
+from archive_store import ARCHIVE_FIELDS, ArchiveReader, SegmentReader, _to_epoch
+from json_values import json_rounded
+
+# ----------------------------
+# 📍 Multi-Resolution Rollups
+# ----------------------------
+# Every poll is added straight into its 1-minute, 15-minute and hourly
+# bucket, per detector and per station. Each (kind, resolution) pair has
+# one fixed-width file per period:
+#
+#   <dir>/<kind>.ids                 one id per line; line number = slot
+#   <dir>/<kind>/<res>/<period>.bin  float32 [slot, bucket, ROLLUP_FIELDS]
+#   <dir>/state.json                 last poll folded in
+#
+# Periods are local calendar months for 1m and years for 15m/1h, and a
+# bucket's row is (t - period start) // resolution. A range query is one
+# contiguous slice per period it touches, so its cost follows the number
+# of points returned, not the size of the archive. Buckets hold sums, so
+# speeds come out count-weighted and a bucket never needs rescanning.
+
+local_timezone = pytz.timezone("America/Los_Angeles")
+
+RESOLUTIONS = {"1m": 60, "15m": 900, "1h": 3600}
+PERIODS = {"1m": "month", "15m": "year", "1h": "year"}
+KINDS = ("detector", "station")
+
+ROLLUP_FIELDS = (
+    "samples",           # detector reports folded in
+    "count",             # vehicles
+    "speedWeight",       # vehicles in reports that also had a speed
+    "speedTimesCount",   # sum of speed * vehicles
+    "occupancySum",
+    "occupancySamples",
+)
+
+DEFAULT_POINTS = 200   # chart width the auto resolution aims to fill
+MAX_POINTS = 20000
+
+
+def _period_bounds(timestamp, period):
+    """(name, first second, first second of the next period) in local time."""
+    moment = datetime.fromtimestamp(timestamp, local_timezone)
+    if period == "month":
+        start = datetime(moment.year, moment.month, 1)
+        following = datetime(moment.year + moment.month // 12, moment.month % 12 + 1, 1)
+        name = start.strftime("%Y-%m")
+    else:
+        start, following = datetime(moment.year, 1, 1), datetime(moment.year + 1, 1, 1)
+        name = start.strftime("%Y")
+    return name, int(local_timezone.localize(start).timestamp()), int(local_timezone.localize(following).timestamp())
+
+
+def choose_resolution(start, end, points=DEFAULT_POINTS):
+    """Coarsest resolution that still gives `points` buckets over [start, end)."""
+    span = max(0, end - start)
+    for name, seconds in sorted(RESOLUTIONS.items(), key=lambda item: -item[1]):
+        if span / seconds >= points:
+            return name
+    return min(RESOLUTIONS, key=RESOLUTIONS.get)
+
+
+def parse_time(value):
+    """Epoch seconds from epoch seconds or an ISO date/time (naive = local).
+
+    Raises ValueError for anything else, including inf, NaN and numbers
+    outside the dates datetime can represent.
+    """
+    try:
+        seconds = float(value)
+    except ValueError:
+        moment = datetime.fromisoformat(value)
+    else:
+        if not math.isfinite(seconds):
+            raise ValueError(f"Not a finite time: {value}")
+        try:
+            datetime.fromtimestamp(seconds, local_timezone)
+        except (OverflowError, OSError) as e:
+            raise ValueError(f"Time out of range: {value}") from e
+        return int(seconds)
+    if moment.tzinfo is None:
+        moment = local_timezone.localize(moment)
+    return int(moment.timestamp())
+
+
+class _IdIndex:
+    """Append-only id -> slot dictionary backed by `<kind>.ids`."""
+
+    def __init__(self, path):
+        self.path = path
+        self.ids = []
+        self.slots = {}
+        self._read_bytes = 0
+        self.reload()
+
+    def reload(self):
+        """Pick up ids another process appended since the last read."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._read_bytes)
+            content = f.read()
+        complete = content[:content.rfind(b"\n") + 1]
+        self._read_bytes += len(complete)
+        for entity_id in complete.decode().splitlines():
+            self.slots[entity_id] = len(self.ids)
+            self.ids.append(entity_id)
+
+    def resolve(self, entity_ids):
+        """Slot per id, appending unseen ids to the file."""
+        unique, inverse = np.unique(entity_ids, return_inverse=True)
+        rows = np.empty(len(unique), dtype=np.intp)
+        new_ids = []
+        for i, entity_id in enumerate(unique.tolist()):
+            slot = self.slots.get(entity_id)
+            if slot is None:
+                slot = self.slots[entity_id] = len(self.ids)
+                self.ids.append(entity_id)
+                new_ids.append(entity_id + "\n")
+            rows[i] = slot
+        if new_ids:
+            with open(self.path, "a") as f:
+                f.write("".join(new_ids))
+            self._read_bytes = os.path.getsize(self.path)
+        return rows[inverse]
+
+
+class RollupWriter:
+    """Fold polls into every (kind, resolution) rollup."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._index = {kind: _IdIndex(os.path.join(directory, f"{kind}.ids")) for kind in KINDS}
+        self._maps = {}  # (kind, resolution) -> (period name, start, memmap)
+
+        self._state_path = os.path.join(directory, "state.json")
+        self.last_timestamp = None
+        if os.path.exists(self._state_path):
+            with open(self._state_path) as f:
+                self.last_timestamp = json.load(f).get("last_timestamp")
+
+    def _partition(self, kind, resolution, timestamp, slots):
+        """Writable [slot, bucket, field] map for the period holding `timestamp`."""
+        name, start, following = _period_bounds(timestamp, PERIODS[resolution])
+        current = self._maps.get((kind, resolution))
+        if current is not None and current[0] == name and len(current[2]) >= slots:
+            return current[1], current[2]
+        if current is not None:
+            current[2].flush()
+
+        path = os.path.join(self.directory, kind, resolution, name + ".bin")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        buckets = (following - start) // RESOLUTIONS[resolution]
+        row_bytes = buckets * len(ROLLUP_FIELDS) * 4
+        capacity = os.path.getsize(path) // row_bytes if os.path.exists(path) else 0
+        if capacity < slots:
+            # Sized to the ids seen so far, doubling as new ones appear
+            capacity = max(slots, 2 * capacity)
+            with open(path, "ab") as f:
+                f.truncate(capacity * row_bytes)
+
+        array = np.memmap(path, dtype="<f4", mode="r+", shape=(capacity, buckets, len(ROLLUP_FIELDS)))
+        self._maps[(kind, resolution)] = (name, start, array)
+        return start, array
+
+    def append(self, timestamp, columns):
+        """Fold one poll (DetectorColumns with ids, speed, count, occupancy) in."""
+        return self.append_arrays(
+            timestamp,
+            columns.column("detectorId").astype(str),
+            columns.column("stationId").astype(str),
+            columns.column("vehicleSpeed"),
+            columns.column("vehicleCount"),
+            columns.column("vehicleOccupancy"),
+        )
+
+    def append_arrays(self, timestamp, detector_ids, station_ids, speed, count, occupancy):
+        """Returns False (and skips) polls at or before the last one folded in."""
+        timestamp = _to_epoch(timestamp)
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            return False
+
+        has_speed, has_count, has_occupancy = ~np.isnan(speed), ~np.isnan(count), ~np.isnan(occupancy)
+        weighted = has_speed & has_count
+        contributions = np.zeros((len(detector_ids), len(ROLLUP_FIELDS)), dtype=np.float64)
+        contributions[:, 0] = 1
+        contributions[:, 1] = np.where(has_count, count, 0.0)
+        contributions[:, 2] = np.where(weighted, count, 0.0)
+        contributions[:, 3] = np.where(weighted, speed * count, 0.0)
+        contributions[:, 4] = np.where(has_occupancy, occupancy, 0.0)
+        contributions[:, 5] = has_occupancy
+
+        detector_slots = self._index["detector"].resolve(detector_ids)
+        station_slots = self._index["station"].resolve(station_ids)
+        stations = len(self._index["station"].ids)
+        station_contributions = np.stack([
+            np.bincount(station_slots, weights=contributions[:, j], minlength=stations)
+            for j in range(len(ROLLUP_FIELDS))
+        ], axis=1)
+        present = np.unique(station_slots)
+
+        for resolution, seconds in RESOLUTIONS.items():
+            for kind, slots, values in (
+                ("detector", detector_slots, contributions),
+                ("station", present, station_contributions[present]),
+            ):
+                start, array = self._partition(kind, resolution, timestamp, len(self._index[kind].ids))
+                bucket = (timestamp - start) // seconds
+                np.add.at(array[:, bucket], slots, values.astype(np.float32))
+
+        self.last_timestamp = timestamp
+        tmp = self._state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"last_timestamp": timestamp}, f)
+        os.replace(tmp, self._state_path)
+        return True
+
+    def flush(self):
+        for _, _, array in self._maps.values():
+            array.flush()
+
+    def close(self):
+        self.flush()
+        self._maps.clear()
+
+
+class RollupReader:
+    """Range queries over the rollups a RollupWriter (any process) maintains."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._index = {kind: _IdIndex(os.path.join(directory, f"{kind}.ids")) for kind in KINDS}
+        self._maps = {}  # path -> (file size, memmap)
+
+    def _map(self, path, buckets):
+        if not os.path.exists(path):
+            return None
+        size = os.path.getsize(path)
+        cached = self._maps.get(path)
+        if cached is None or cached[0] != size:
+            # Replaced, not closed: slices handed out earlier may still view it
+            slots = size // (buckets * len(ROLLUP_FIELDS) * 4)
+            cached = self._maps[path] = (size, np.memmap(path, dtype="<f4", mode="r", shape=(slots, buckets, len(ROLLUP_FIELDS))))
+        return cached[1]
+
+    def buckets(self, kind, entity_id, start, end, resolution):
+        """Raw [bucket, field] sums and bucket start times for start <= t < end."""
+        index = self._index[kind]
+        if entity_id not in index.slots:
+            index.reload()
+        slot = index.slots.get(entity_id)
+        if slot is None:
+            return None
+
+        seconds = RESOLUTIONS[resolution]
+        first = start // seconds * seconds
+        times = np.arange(first, end, seconds, dtype=np.int64)
+        sums = np.zeros((len(times), len(ROLLUP_FIELDS)), dtype=np.float64)
+
+        cursor = first
+        while cursor < end:
+            name, period_start, following = _period_bounds(cursor, PERIODS[resolution])
+            stop = min(end, following)
+            array = self._map(
+                os.path.join(self.directory, kind, resolution, name + ".bin"),
+                (following - period_start) // seconds
+            )
+            if array is not None and slot < len(array):
+                lo = (cursor - period_start) // seconds
+                hi = -(-(stop - period_start) // seconds)
+                out = (cursor - first) // seconds
+                sums[out:out + hi - lo] = array[slot, lo:hi]
+            cursor = following
+        return times, sums
+
+    def range(self, kind, entity_id, start, end, resolution="auto", points=DEFAULT_POINTS):
+        """Columnar series for one detector or station; None for an unknown id."""
+        if resolution == "auto":
+            resolution = choose_resolution(start, end, points)
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"resolution must be auto or one of {', '.join(RESOLUTIONS)}")
+        if (end - start) / RESOLUTIONS[resolution] > MAX_POINTS:
+            raise ValueError(f"range spans more than {MAX_POINTS} buckets at {resolution}")
+
+        result = self.buckets(kind, entity_id, start, end, resolution)
+        if result is None:
+            return None
+        times, sums = result
+        samples, count, weight, speed_x_count, occupancy_sum, occupancy_samples = sums.T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            speed = np.where(weight > 0, speed_x_count / weight, np.nan)
+            occupancy = np.where(occupancy_samples > 0, occupancy_sum / occupancy_samples, np.nan)
+        vehicles = np.where(samples > 0, count, np.nan)
+
+        return {
+            kind: entity_id,
+            "resolution": resolution,
+            "timestamps": [
+                datetime.fromtimestamp(t, local_timezone).strftime('%Y-%m-%d %H:%M:%S')
+                for t in times.tolist()
+            ],
+            "speed": json_rounded(speed),
+            "vehicles": json_rounded(vehicles),
+            "occupancy": json_rounded(occupancy),
+            "samples": samples.astype(int).tolist(),
+        }
+
+
+# ----------------------------
+# 📍 Backfill
+# ----------------------------
+def backfill_from_archive(archive_directory, rollup_directory):
+    """Fold every archived poll newer than the rollups' last one in.
+
+    Returns the number of polls added.
+    """
+    writer = RollupWriter(rollup_directory)
+    fields = [ARCHIVE_FIELDS.index(f) for f in ("vehicleSpeed", "vehicleCount", "vehicleOccupancy")]
+    added = 0
+    try:
+        for stem in ArchiveReader(archive_directory).segments():
+            reader = SegmentReader(stem)
+            try:
+                if writer.last_timestamp is not None and len(reader.index) and reader.index["timestamp"][-1] <= writer.last_timestamp:
+                    continue
+                detector_ids = np.array([d for d, _ in reader.detector_ids], dtype=str)
+                station_ids = np.array([s for _, s in reader.detector_ids], dtype=str)
+                start = None if writer.last_timestamp is None else writer.last_timestamp + 1
+                for timestamp, indices, values in reader.frames(start):
+                    speed, count, occupancy = (values[:, j].astype(np.float64) for j in fields)
+                    added += writer.append_arrays(timestamp, detector_ids[indices], station_ids[indices], speed, count, occupancy)
+                indices = values = None
+            finally:
+                reader.close()
+    finally:
+        writer.close()
+    return added
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or catch up rollups from the segment archive.")
+    parser.add_argument("archive_directory")
+    parser.add_argument("rollup_directory")
+    args = parser.parse_args()
+
+    count = backfill_from_archive(args.archive_directory, args.rollup_directory)
+    print(f"Folded {count} polls into {args.rollup_directory}")
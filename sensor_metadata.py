@@ -0,0 +1,140 @@
+import gzip
+import hashlib
+import json
+import math
+from functools import lru_cache
+
+import numpy as np
+
+# ----------------------------
+# 📍 Sensor Metadata Index
+# ----------------------------
+# The metadata file is read once. The full list is kept pre-serialized and
+# pre-gzipped with its ETag, and a uniform lat/lon grid answers bbox and
+# nearest-sensor queries without scanning every sensor.
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180.0
+
+
+class SerializedBody:
+    """A JSON body with its gzip variant and ETag, built once."""
+
+    def __init__(self, payload):
+        self.body = json.dumps(payload, separators=(",", ":")).encode()
+        self.gzip_body = gzip.compress(self.body, compresslevel=9)
+        self.etag = hashlib.sha1(self.body).hexdigest()
+
+
+class SensorMetadata:
+    """In-memory sensor list with a grid index over latitude/longitude."""
+
+    def __init__(self, path, cell_degrees=0.01):
+        with open(path) as f:
+            self.sensors = json.load(f)
+
+        self.ids = [sensor["detector_id"] for sensor in self.sensors]
+        self.sets = np.array([sensor.get("set") for sensor in self.sensors], dtype=object)
+        self.latitude = np.array([sensor["latitude"] for sensor in self.sensors], dtype=np.float64)
+        self.longitude = np.array([sensor["longitude"] for sensor in self.sensors], dtype=np.float64)
+        self.coordinates = {
+            sensor["detector_id"]: (sensor["latitude"], sensor["longitude"])
+            for sensor in self.sensors
+        }
+        self.full = SerializedBody(self.sensors)
+
+        self.cell_degrees = cell_degrees
+        rows = np.floor(self.latitude / cell_degrees).astype(np.int64)
+        cols = np.floor(self.longitude / cell_degrees).astype(np.int64)
+        self._grid = {}
+        for index, cell in enumerate(zip(rows.tolist(), cols.tolist())):
+            self._grid.setdefault(cell, []).append(index)
+        self._grid = {cell: np.array(indices, dtype=np.intp) for cell, indices in self._grid.items()}
+        self._row_range = (rows.min(), rows.max()) if len(rows) else (0, -1)
+        self._col_range = (cols.min(), cols.max()) if len(cols) else (0, -1)
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def _candidates(self, cells):
+        arrays = [self._grid[cell] for cell in cells if cell in self._grid]
+        return np.concatenate(arrays) if arrays else np.empty(0, dtype=np.intp)
+
+    def in_bbox(self, west, south, east, north):
+        """Indices of sensors inside the box, in file order."""
+        row_lo, col_lo = self._cell(south, west)
+        row_hi, col_hi = self._cell(north, east)
+        row_lo, row_hi = max(row_lo, self._row_range[0]), min(row_hi, self._row_range[1])
+        col_lo, col_hi = max(col_lo, self._col_range[0]), min(col_hi, self._col_range[1])
+        if row_lo > row_hi or col_lo > col_hi:
+            return np.empty(0, dtype=np.intp)
+
+        if (row_hi - row_lo + 1) * (col_hi - col_lo + 1) > len(self._grid):
+            cells = [(r, c) for r, c in self._grid if row_lo <= r <= row_hi and col_lo <= c <= col_hi]
+        else:
+            cells = [(r, c) for r in range(row_lo, row_hi + 1) for c in range(col_lo, col_hi + 1)]
+
+        candidates = self._candidates(cells)
+        lat, lon = self.latitude[candidates], self.longitude[candidates]
+        inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        return np.sort(candidates[inside])
+
+    def ids_in_bbox(self, west, south, east, north):
+        return [self.ids[i] for i in self.in_bbox(west, south, east, north)]
+
+    def nearest(self, lat, lon, k=5, sets=None):
+        """(indices, meters) of the k nearest sensors, closest first.
+
+        Searches square rings of grid cells outwards from the query cell and
+        stops once the k-th best distance is within the searched radius. Once
+        the rings would cover more cells than are occupied (queries far from
+        every sensor), it measures every sensor in one pass instead.
+        """
+        row, col = self._cell(lat, lon)
+        max_ring = max(
+            abs(row - self._row_range[0]), abs(row - self._row_range[1]),
+            abs(col - self._col_range[0]), abs(col - self._col_range[1])
+        ) if self.sensors else -1
+        # Smallest ground distance one cell can span, for the stopping bound
+        cell_m = self.cell_degrees * METERS_PER_DEGREE * math.cos(math.radians(min(abs(lat) + self.cell_degrees * (max_ring + 1), 89.0)))
+
+        found = np.empty(0, dtype=np.intp)
+        for ring in range(max_ring + 1):
+            if (2 * ring + 1) ** 2 > len(self._grid):
+                found = np.arange(len(self.sensors))
+                if sets is not None:
+                    found = self.filter_sets(found, sets)
+                break
+            if ring == 0:
+                cells = [(row, col)]
+            else:
+                cells = [(row + dr, col + dc) for dr in range(-ring, ring + 1) for dc in (-ring, ring)]
+                cells += [(row + dr, col + dc) for dr in (-ring, ring) for dc in range(-ring + 1, ring)]
+            candidates = self._candidates(cells)
+            if sets is not None:
+                candidates = candidates[np.isin(self.sets[candidates], list(sets))]
+            found = np.concatenate([found, candidates])
+
+            if len(found) >= k:
+                distances = self._distance_m(lat, lon, found)
+                if np.partition(distances, k - 1)[k - 1] <= ring * cell_m:
+                    break
+
+        distances = self._distance_m(lat, lon, found)
+        order = np.argsort(distances, kind="stable")[:k]
+        return found[order], distances[order]
+
+    def _distance_m(self, lat, lon, indices):
+        """Haversine distance from (lat, lon) to each indexed sensor."""
+        lat1, lon1 = math.radians(lat), math.radians(lon)
+        lat2, lon2 = np.radians(self.latitude[indices]), np.radians(self.longitude[indices])
+        a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+    def filter_sets(self, indices, sets):
+        return indices[np.isin(self.sets[indices], list(sets))]
+
+    @lru_cache(maxsize=256)
+    def subset(self, indices):
+        """SerializedBody for a tuple of sensor indices (cached per viewport)."""
+        return SerializedBody([self.sensors[i] for i in indices])
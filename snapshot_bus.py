@@ -0,0 +1,205 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from detector_parser import DetectorColumns
+
+# ----------------------------
+# 📍 Shared-Memory Snapshot Bus
+# ----------------------------
+# One collector publishes each poll into a memory-mapped file; any number
+# of web workers map it read-only and pick up new sequence numbers.
+#
+# Layout: a fixed header followed by two equally sized slots. The writer
+# fills the slot readers are *not* using, then flips `active` inside a
+# seqlock (seq is odd while the header is changing). A reader copies the
+# header, decodes the active slot in place and re-checks seq; a slot is
+# only rewritten two publishes later, so decoded views stay valid for at
+# least one full poll interval.
+#
+# Slot payload: JSON header, newline-joined id columns, then the float64
+# value block (rows x value columns), 8-byte aligned.
+
+MAGIC = b"TSNP"
+VERSION = 1
+HEADER = struct.Struct("<4sIQQIQQ")  # magic, version, seq, slot size, active slot, len slot 0, len slot 1
+HEADER_SIZE = 64
+DEFAULT_SLOT_SIZE = 1 << 20
+NONE_ID = "\x00"
+
+
+def default_snapshot_path():
+    shm = "/dev/shm"
+    base = shm if os.path.isdir(shm) else tempfile.gettempdir()
+    return os.path.join(base, "traffic_snapshot.bin")
+
+
+def encode_snapshot(timestamp, columns):
+    rows = columns.size
+    id_blob = "\n".join(
+        NONE_ID if value is None else value
+        for key in columns.id_keys
+        for value in columns.column(key).tolist()
+    ).encode()
+    meta = json.dumps({
+        "timestamp": timestamp,
+        "rows": rows,
+        "fields": columns.fields,
+        "id_keys": columns.id_keys,
+        "value_keys": columns.value_keys,
+        "id_bytes": len(id_blob),
+    }).encode()
+
+    head = struct.pack("<I", len(meta)) + meta + id_blob
+    padding = b"\x00" * (-len(head) % 8)
+    values = np.ascontiguousarray(columns.values[:rows], dtype="<f8").tobytes()
+    return head + padding + values
+
+
+def decode_snapshot(buffer):
+    """Return (timestamp, DetectorColumns); values are a view into `buffer`."""
+    meta_len = struct.unpack_from("<I", buffer, 0)[0]
+    meta = json.loads(bytes(buffer[4:4 + meta_len]))
+    id_start = 4 + meta_len
+    id_end = id_start + meta["id_bytes"]
+    values_start = id_end + (-id_end % 8)
+
+    rows = meta["rows"]
+    columns = DetectorColumns.__new__(DetectorColumns)
+    columns.fields = meta["fields"]
+    columns.id_keys = meta["id_keys"]
+    columns.value_keys = meta["value_keys"]
+    columns.size = rows
+
+    ids = bytes(buffer[id_start:id_end]).decode().split("\n") if rows else []
+    columns.ids = np.array(
+        [None if value == NONE_ID else value for value in ids],
+        dtype=object
+    ).reshape(len(columns.id_keys), rows).T
+    columns.values = np.frombuffer(buffer, dtype="<f8", count=rows * len(columns.value_keys), offset=values_start)
+    columns.values = columns.values.reshape(rows, len(columns.value_keys))
+    return meta["timestamp"], columns
+
+
+class SnapshotPublisher:
+    """Single writer side of the bus."""
+
+    def __init__(self, path=None, slot_size=DEFAULT_SLOT_SIZE):
+        self.path = path or default_snapshot_path()
+        self._file = open(self.path, "a+b")
+        self.seq = 0
+        slot_size = self._take_over(slot_size)
+        self._map(slot_size)
+        self._write_header(active=0, lengths=(0, 0))
+
+    def _take_over(self, slot_size):
+        """Adopt a previous publisher's file before remapping it.
+
+        Readers may still map the file at its old (possibly grown) size, so
+        it is never shrunk, and seq is made odd, continuing the old sequence,
+        before the header changes. Returns the slot size to map.
+        """
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER_SIZE:
+            return slot_size
+        mm = mmap.mmap(self._file.fileno(), size)
+        try:
+            magic, version, seq = HEADER.unpack_from(mm, 0)[:3]
+            if magic == MAGIC and version == VERSION:
+                self.seq = seq | 1
+                struct.pack_into("<Q", mm, 8, self.seq)
+        finally:
+            mm.close()
+        return max(slot_size, -(-(size - HEADER_SIZE) // 2))
+
+    def _map(self, slot_size):
+        self.slot_size = slot_size
+        self._file.truncate(HEADER_SIZE + 2 * slot_size)
+        self._mm = mmap.mmap(self._file.fileno(), HEADER_SIZE + 2 * slot_size)
+
+    def _write_header(self, active, lengths):
+        self.active = active
+        self.lengths = list(lengths)
+        HEADER.pack_into(self._mm, 0, MAGIC, VERSION, self.seq, self.slot_size, active, *lengths)
+
+    def _set_seq(self, seq):
+        self.seq = seq
+        struct.pack_into("<Q", self._mm, 8, seq)
+
+    def publish(self, timestamp, columns):
+        """Write one poll and bump the sequence number; returns the new seq."""
+        payload = encode_snapshot(timestamp, columns)
+
+        if len(payload) > self.slot_size:
+            # Grow both slots; seq stays odd until the header is rewritten,
+            # and readers remap when they see the new slot size
+            self._set_seq(self.seq + 1)
+            self._mm.close()
+            self._map(max(len(payload), 2 * self.slot_size))
+            target, lengths = 0, [0, 0]
+        else:
+            target, lengths = 1 - self.active, list(self.lengths)
+
+        start = HEADER_SIZE + target * self.slot_size
+        self._mm[start:start + len(payload)] = payload
+        lengths[target] = len(payload)
+
+        if self.seq % 2 == 0:
+            self._set_seq(self.seq + 1)
+        self._write_header(target, lengths)
+        self._set_seq(self.seq + 1)
+        return self.seq
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+
+class SnapshotReader:
+    """Read-only attachment to a publisher's file."""
+
+    def __init__(self, path=None):
+        self.path = path or default_snapshot_path()
+        self.last_seq = 0
+        self._mm = None
+        self._size = 0
+
+    def _attach(self):
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if size < HEADER_SIZE:
+            return False
+        if self._mm is None or size != self._size:
+            # The old mapping is dropped, not closed: arrays handed out
+            # earlier may still be viewing it
+            with open(self.path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            self._size = size
+        return True
+
+    def poll(self):
+        """Return (seq, timestamp, DetectorColumns) for a new snapshot, else None."""
+        if not self._attach():
+            return None
+
+        for _ in range(8):
+            magic, version, seq, slot_size, active, *lengths = HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC or version != VERSION or seq % 2 or seq == self.last_seq or not lengths[active]:
+                return None
+            if HEADER_SIZE + 2 * slot_size != self._size:
+                if not self._attach() or HEADER_SIZE + 2 * slot_size != self._size:
+                    return None
+                continue
+
+            start = HEADER_SIZE + active * slot_size
+            timestamp, columns = decode_snapshot(memoryview(self._mm)[start:start + lengths[active]])
+            if struct.unpack_from("<Q", self._mm, 8)[0] == seq:
+                self.last_seq = seq
+                return seq, timestamp, columns
+        return None
+
+    def close(self):
+        self._mm = None
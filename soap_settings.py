@@ -0,0 +1,37 @@
+# ----------------------------
+# 📍 SOAP Settings
+# ----------------------------
+# Request header for `dlDetectorDataRequest`, shared by app.py,
+# json_dump_python_v2.py and the benchmarks. Plain data only, so importing
+# it never pulls in zeep or the app.
+
+# Authentication parameters
+auth_params = {
+    "user-id": "UNLV_TRC_RTIS",
+    "password": "+r@^~Tr&lt;R?|$"
+}
+organization_info = {
+    "organization-id": "unlv.edu",
+    "center-contact-list": {
+        "center-contact-details": {"center-id": "UNLV_TRC"}
+    }
+}
+requesting_organization_info = {
+    "organization-id": "its.nv.gov",
+    "center-contact-list": {
+        "center-contact-details": {"center-id": "FAST"}
+    }
+}
+device_type = "detector"
+device_info = "device data"
+
+# SOAP request parameters
+soap_parameters = {
+    "device-information-request-header": {
+        "authentication": auth_params,
+        "organization-information": organization_info,
+        "organization-requesting": requesting_organization_info,
+        "device-type": device_type,
+        "device-information-type": device_info
+    }
+}
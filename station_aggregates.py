@@ -0,0 +1,136 @@
+import math
+import threading
+
+import numpy as np
+
+from json_values import json_rounded
+
+# ----------------------------
+# 📍 Station Aggregates
+# ----------------------------
+# Once per poll, detector columns are grouped by station with bincount:
+# mean speed, total count, mean occupancy and whether the station reported
+# at all. Each station's last `window` aggregates sit in a ring buffer and
+# the rolling sum / count / min / max are updated from the slot that comes
+# in and the slot that falls out; a row is rescanned only when the value
+# leaving it was its current min or max.
+
+METRICS = ("speed", "count", "occupancy")
+
+
+class StationAggregator:
+    """Vectorized per-station rollups with incremental rolling windows."""
+
+    def __init__(self, window, initial_stations=1024):
+        self.window = max(1, int(window))
+        self.station_ids = []
+        self._index = {}
+        self._head = 0
+        self._lock = threading.Lock()
+        self._allocate(initial_stations)
+
+    @classmethod
+    def from_config(cls, config, initial_stations=1024):
+        """Window covers `sensor_info_minutes_back`."""
+        time_step = config.get("time_step_minutes", 0.5)
+        minutes_back = config.get("sensor_info_minutes_back", 15)
+        return cls(math.ceil(minutes_back / time_step), initial_stations)
+
+    def _allocate(self, stations):
+        shape = (stations, len(METRICS))
+        self._ring = np.full((stations, self.window, len(METRICS)), np.nan)
+        self._sum = np.zeros(shape)
+        self._samples = np.zeros(shape, dtype=np.int64)
+        self._min = np.full(shape, np.nan)
+        self._max = np.full(shape, np.nan)
+
+    def _grow(self, stations):
+        old = (self._ring, self._sum, self._samples, self._min, self._max)
+        self._allocate(stations)
+        for new, previous in zip((self._ring, self._sum, self._samples, self._min, self._max), old):
+            new[:len(previous)] = previous
+
+    def _station_rows(self, station_ids):
+        """Persistent row per station plus each detector's row."""
+        unique, inverse = np.unique(station_ids.astype(str), return_inverse=True)
+        rows = np.empty(len(unique), dtype=np.intp)
+        for i, station_id in enumerate(unique.tolist()):
+            row = self._index.get(station_id)
+            if row is None:
+                row = self._index[station_id] = len(self.station_ids)
+                self.station_ids.append(station_id)
+            rows[i] = row
+        if len(self.station_ids) > len(self._ring):
+            self._grow(max(len(self.station_ids), 2 * len(self._ring)))
+        return rows[inverse]
+
+    def update(self, timestamp, columns):
+        """Fold one poll (DetectorColumns) in and return the station summary."""
+        with self._lock:
+            detector_rows = self._station_rows(columns.column("stationId"))
+            stations = len(self.station_ids)
+
+            current = np.full((stations, len(METRICS)), np.nan)
+            reporting = np.bincount(detector_rows, minlength=stations)
+            for j, field in enumerate(("vehicleSpeed", "vehicleCount", "vehicleOccupancy")):
+                values = columns.column(field)
+                valid = ~np.isnan(values)
+                total = np.bincount(detector_rows[valid], weights=values[valid], minlength=stations)
+                samples = np.bincount(detector_rows[valid], minlength=stations)
+                if METRICS[j] == "count":
+                    current[:, j] = np.where(samples > 0, total, np.nan)
+                else:
+                    with np.errstate(invalid="ignore", divide="ignore"):
+                        current[:, j] = np.where(samples > 0, total / samples, np.nan)
+
+            self._roll(current)
+            return self._summary(timestamp, current, reporting > 0)
+
+    def _roll(self, current):
+        stations = len(current)
+        ring = self._ring[:stations]
+        outgoing = ring[:, self._head].copy()
+        ring[:, self._head] = current
+        self._head = (self._head + 1) % self.window
+
+        leaving, arriving = ~np.isnan(outgoing), ~np.isnan(current)
+        self._sum[:stations] += np.where(arriving, current, 0.0) - np.where(leaving, outgoing, 0.0)
+        self._samples[:stations] += arriving.astype(np.int64) - leaving.astype(np.int64)
+
+        for extreme, pick, reduce in ((self._min, np.fmin, np.nanmin), (self._max, np.fmax, np.nanmax)):
+            view = extreme[:stations]
+            stale = leaving & (outgoing == view)
+            view[:] = pick(view, current)
+            rows, metrics = np.nonzero(stale)
+            if len(rows):
+                window = ring[rows, :, metrics]
+                has_values = ~np.isnan(window).all(axis=1)
+                refreshed = np.full(len(rows), np.nan)
+                refreshed[has_values] = reduce(window[has_values], axis=1)
+                view[rows, metrics] = refreshed
+
+    def _summary(self, timestamp, current, live):
+        stations = len(current)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(self._samples[:stations] > 0, self._sum[:stations] / self._samples[:stations], np.nan)
+
+        summary = {
+            "timestamp": timestamp,
+            "stationId": list(self.station_ids),
+            "live": live.astype(int).tolist(),
+        }
+        for j, metric in enumerate(METRICS):
+            summary[metric] = json_rounded(current[:, j])
+            summary[metric + "Min"] = json_rounded(self._min[:stations, j])
+            summary[metric + "Mean"] = json_rounded(mean[:, j])
+            summary[metric + "Max"] = json_rounded(self._max[:stations, j])
+        return summary
+
+
+def select_stations(summary, station_ids):
+    """Rows of a summary restricted to `station_ids`."""
+    keep = [i for i, station_id in enumerate(summary["stationId"]) if station_id in station_ids]
+    return {
+        key: value if key == "timestamp" else [value[i] for i in keep]
+        for key, value in summary.items()
+    }
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archive_store import ARCHIVE_FIELDS, INDEX_DTYPE, ArchiveReader, SegmentWriter
+
+START = 1760000000
+
+
+def write_polls(stem, polls, first=0):
+    writer = SegmentWriter(stem, fsync=False)
+    for t in range(first, first + polls):
+        ids = [(f"D{i}", f"S{i // 2}") for i in range(3 + t)]
+        values = np.full((len(ids), len(ARCHIVE_FIELDS)), t, dtype=np.float32)
+        writer.append_columns(START + 60 * t, ids, values)
+    writer.close()
+
+
+def tear(path, junk):
+    with open(path, "ab") as f:
+        f.write(junk)
+
+
+def assert_polls(directory, polls):
+    result = ArchiveReader(directory).read()
+    assert result["timestamps"].tolist() == [START + 60 * t for t in range(polls)]
+    speed = result["vehicleSpeed"]
+    for t in range(polls):
+        np.testing.assert_array_equal(speed[t, :3 + t], t)
+        assert np.isnan(speed[t, 3 + t:]).all()
+
+
+def test_reopen_after_torn_tails(tmp_path):
+    stem = str(tmp_path / "2025-10-09")
+    write_polls(stem, 3)
+
+    # A crash mid-append: half a frame, half a dictionary line, and a
+    # partial index record that doesn't change the whole-record count
+    tear(stem + ".seg", b"TSEG\x01\x00\x00")
+    tear(stem + ".ids", b"D99\tS")
+    tear(stem + ".idx", b"\x00\x01\x02")
+
+    write_polls(stem, 1, first=3)
+    assert os.path.getsize(stem + ".idx") == 4 * INDEX_DTYPE.itemsize
+    assert_polls(str(tmp_path), 4)
+
+
+def test_reopen_rebuilds_missing_index_entries(tmp_path):
+    stem = str(tmp_path / "2025-10-09")
+    write_polls(stem, 3)
+
+    # Frame reached disk but its index record didn't
+    with open(stem + ".idx", "rb+") as f:
+        f.truncate(2 * INDEX_DTYPE.itemsize)
+
+    write_polls(stem, 1, first=3)
+    assert_polls(str(tmp_path), 4)
@@ -0,0 +1,79 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detector_parser import LIVE_FIELDS, DetectorColumns
+from snapshot_bus import HEADER_SIZE, SnapshotPublisher, SnapshotReader
+
+
+def make_columns(rows, speed):
+    return DetectorColumns.from_records([
+        {"stationId": f"S{i // 4}", "detectorId": f"D{i}", "vehicleSpeed": speed + i,
+         "vehicleCount": i, "vehicleOccupancy": None}
+        for i in range(rows)
+    ], LIVE_FIELDS)
+
+
+def assert_snapshot(polled, timestamp, rows, speed):
+    seq, got_timestamp, columns = polled
+    assert got_timestamp == timestamp
+    assert columns.size == rows
+    assert columns.column("detectorId").tolist() == [f"D{i}" for i in range(rows)]
+    np.testing.assert_array_equal(columns.column("vehicleSpeed"), speed + np.arange(rows))
+    assert np.isnan(columns.column("vehicleOccupancy")).all()
+    return seq
+
+
+def test_slots_flip_between_publishes(tmp_path):
+    path = str(tmp_path / "bus.bin")
+    publisher = SnapshotPublisher(path, slot_size=4096)
+    reader = SnapshotReader(path)
+    assert reader.poll() is None
+
+    first = publisher.publish("t0", make_columns(3, 10))
+    assert publisher.active == 1
+    assert assert_snapshot(reader.poll(), "t0", 3, 10) == first
+    assert reader.poll() is None  # nothing new
+
+    seq = publisher.publish("t1", make_columns(5, 20))
+    assert publisher.active == 0
+    assert assert_snapshot(reader.poll(), "t1", 5, 20) == seq > first
+    publisher.close()
+
+
+def test_growth_remaps_reader(tmp_path):
+    path = str(tmp_path / "bus.bin")
+    publisher = SnapshotPublisher(path, slot_size=1024)
+    reader = SnapshotReader(path)
+    publisher.publish("small", make_columns(2, 1))
+    assert_snapshot(reader.poll(), "small", 2, 1)
+
+    publisher.publish("large", make_columns(500, 2))
+    assert publisher.slot_size > 1024
+    assert os.path.getsize(path) == HEADER_SIZE + 2 * publisher.slot_size
+    assert_snapshot(reader.poll(), "large", 500, 2)
+    publisher.close()
+
+
+def test_restart_keeps_grown_file_and_sequence(tmp_path):
+    path = str(tmp_path / "bus.bin")
+    publisher = SnapshotPublisher(path, slot_size=1024)
+    reader = SnapshotReader(path)
+    publisher.publish("large", make_columns(500, 3))
+    old_seq = assert_snapshot(reader.poll(), "large", 500, 3)
+    grown = os.path.getsize(path)
+    publisher.close()
+
+    # A restarted collector must not shrink the file under mapped readers
+    restarted = SnapshotPublisher(path, slot_size=1024)
+    assert os.path.getsize(path) == grown
+    assert restarted.seq % 2 == 1 and restarted.seq > old_seq
+    assert reader.poll() is None
+
+    seq = restarted.publish("after restart", make_columns(2, 4))
+    assert seq > old_seq
+    assert_snapshot(reader.poll(), "after restart", 2, 4)
+    restarted.close()
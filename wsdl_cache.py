@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+# ----------------------------
+# 📍 WSDL Cache
+# ----------------------------
+# The TMDD WSDL is kept on disk, one file per content hash, with
+# `current.json` pointing at the version in use:
+#
+#   <cache>/current.json        {"version", "file", "url", "fetched_at"}
+#   <cache>/<version>.wsdl
+#   <cache>/zeep.sqlite         zeep's cache for any imported schemas
+#
+# Clients start from the cached copy, so a restart neither downloads the
+# WSDL nor depends on the upstream being reachable. A background thread
+# re-downloads it and swaps in a rebuilt client only when the content
+# changed.
+
+KEEP_VERSIONS = 3
+
+
+class WsdlCache:
+    """Versioned on-disk copy of one WSDL URL."""
+
+    def __init__(self, url, directory):
+        self.url = url
+        self.directory = directory
+        self.pointer = os.path.join(directory, "current.json")
+
+    def current(self):
+        """Pointer dict for the cached version in use, or None."""
+        try:
+            with open(self.pointer) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("url") != self.url or not os.path.exists(os.path.join(self.directory, entry["file"])):
+            return None
+        return entry
+
+    def current_path(self):
+        entry = self.current()
+        return os.path.join(self.directory, entry["file"]) if entry else None
+
+    def refresh(self, timeout=20):
+        """Download the WSDL; returns (path, changed)."""
+        import requests
+
+        response = requests.get(self.url, timeout=timeout)
+        response.raise_for_status()
+        content = response.content
+
+        version = hashlib.sha256(content).hexdigest()[:16]
+        entry = self.current()
+        if entry and entry["version"] == version:
+            return os.path.join(self.directory, entry["file"]), False
+
+        os.makedirs(self.directory, exist_ok=True)
+        filename = f"{version}.wsdl"
+        _atomic_write(os.path.join(self.directory, filename), content)
+        _atomic_write(self.pointer, json.dumps({
+            "version": version,
+            "file": filename,
+            "url": self.url,
+            "fetched_at": datetime.now(timezone.utc).isoformat(),
+        }, indent=4).encode())
+        self._prune(keep=filename)
+        return os.path.join(self.directory, filename), True
+
+    def _prune(self, keep):
+        versions = sorted(
+            (f for f in os.listdir(self.directory) if f.endswith(".wsdl")),
+            key=lambda f: os.path.getmtime(os.path.join(self.directory, f)),
+            reverse=True
+        )
+        for filename in versions[KEEP_VERSIONS:]:
+            if filename != keep:
+                os.remove(os.path.join(self.directory, filename))
+
+
+def _atomic_write(path, content):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def make_client(wsdl_url, timeout=30, operation_timeout=30, pool_size=4, cache_path=None):
+    """zeep Client on a pooled keep-alive session with request timeouts.
+
+    `wsdl_url` may be a local file (a cached copy); `cache_path` keeps any
+    schemas it imports in zeep's sqlite cache. zeep and requests are
+    imported here so web workers that never poll don't pay for them.
+    """
+    import requests
+    from zeep import Client, Settings
+    from zeep.cache import SqliteCache
+    from zeep.transports import Transport
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    cache = SqliteCache(path=cache_path, timeout=None) if cache_path else None
+    transport = Transport(session=session, timeout=timeout, operation_timeout=operation_timeout, cache=cache)
+    return Client(wsdl=wsdl_url, settings=Settings(strict=False, xml_huge_tree=True), transport=transport)
+
+
+class CachedClient:
+    """zeep Client built lazily from the WSDL cache, refreshed in the background."""
+
+    def __init__(self, url, directory, timeout=20, refresh_hours=24):
+        self.cache = WsdlCache(url, directory)
+        self.timeout = timeout
+        self.refresh_seconds = refresh_hours * 3600
+        self._client = None
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+
+    def _build(self, path):
+        return make_client(path, timeout=self.timeout, operation_timeout=self.timeout,
+                           cache_path=os.path.join(self.cache.directory, "zeep.sqlite"))
+
+    def get(self):
+        """The current client; downloads the WSDL only if nothing is cached yet."""
+        with self._lock:
+            if self._client is None:
+                path = self.cache.current_path()
+                if path is None:
+                    path, _ = self.cache.refresh(self.timeout)
+                self._client = self._build(path)
+            return self._client
+
+    def refresh(self):
+        """Re-download now; rebuild and swap the client if the WSDL changed."""
+        path, changed = self.cache.refresh(self.timeout)
+        if changed or self._client is None:
+            client = self._build(path)
+            with self._lock:
+                self._client = client
+        return changed
+
+    def start_background_refresh(self, initial_delay=60):
+        if self._refresh_thread is not None:
+            return
+
+        def loop():
+            delay = initial_delay
+            while True:
+                time.sleep(delay)
+                try:
+                    if self.refresh():
+                        print(f"WSDL changed upstream; now using {self.cache.current()['version']}")
+                    delay = self.refresh_seconds
+                except Exception as e:
+                    print(f"WSDL refresh failed: {e}")
+                    delay = min(self.refresh_seconds, max(initial_delay, 300))
+
+        self._refresh_thread = threading.Thread(target=loop, name="wsdl-refresh", daemon=True)
+        self._refresh_thread.start()